@@ -90,7 +90,69 @@ def run():
             CREATE INDEX IF NOT EXISTS ix_category_user_id ON categories(user_id)
         """))
 
+        print("Adding dashboard filter indexes...")
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_dataset_user_id_desc ON datasets(user_id, id DESC)
+        """))
+        # (user_id, uploaded_at DESC, id DESC) + covering columns for the
+        # profile page. Only an older definition of the same name (from
+        # before INCLUDE was added) is dropped and rebuilt, so re-running
+        # the migration leaves a current index alone.
+        indexdef = conn.execute(text("""
+            SELECT indexdef FROM pg_indexes
+            WHERE tablename = 'datasets' AND indexname = 'ix_dataset_user_uploaded'
+        """)).scalar()
+        if indexdef and ("INCLUDE" not in indexdef or "uploaded_at DESC" not in indexdef):
+            print("Rebuilding ix_dataset_user_uploaded with covering columns...")
+            conn.execute(text("""
+                DROP INDEX IF EXISTS ix_dataset_user_uploaded
+            """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_dataset_user_uploaded
+            ON datasets(user_id, uploaded_at DESC, id DESC)
+            INCLUDE (row_count, duplicate_records)
+        """))
+
+        print("Adding detected contact columns to datasets...")
+        conn.execute(text("""
+            ALTER TABLE datasets 
+            ADD COLUMN IF NOT EXISTS phone_col VARCHAR
+        """))
+        conn.execute(text("""
+            ALTER TABLE datasets 
+            ADD COLUMN IF NOT EXISTS email_col VARCHAR
+        """))
+
+        print("Adding upload content hash to datasets...")
+        conn.execute(text("""
+            ALTER TABLE datasets 
+            ADD COLUMN IF NOT EXISTS content_hash VARCHAR
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_dataset_user_content_hash
+            ON datasets(user_id, content_hash)
+        """))
+
         conn.commit()
+
+        # ── Trigram index for file-name search (optional) ─────────────
+        # CREATE EXTENSION needs CREATE privilege on the database, so it
+        # runs last in its own transaction: the columns above are already
+        # committed and search just falls back to a sequential scan.
+        print("Adding file-name trigram index...")
+        try:
+            conn.execute(text("""
+                CREATE EXTENSION IF NOT EXISTS pg_trgm
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_dataset_filename_trgm
+                ON datasets USING gin (file_name gin_trgm_ops)
+            """))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ trigram index skipped: {e}")
+
         print("\n✅ Migration complete.")
 
 if __name__ == "__main__":
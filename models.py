@@ -1,6 +1,6 @@
 # models.py — replace Dataset and Category classes
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, func, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, func, Index, UniqueConstraint, desc
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from database import Base
@@ -92,6 +92,16 @@ class Dataset(Base):
 
     uploaded_at      = Column(DateTime, default=ist_now)
 
+    # Phone / email column names detected once at upload (NULL = not scanned
+    # yet, or the file has no such column) — exports read these directly.
+    phone_col        = Column(String, nullable=True)
+    email_col        = Column(String, nullable=True)
+
+    # SHA-256 of the uploaded bytes — a re-upload of the same file opens the
+    # existing dataset instead of being processed again. NULL for datasets
+    # created through the header-correction page.
+    content_hash     = Column(String, nullable=True)
+
     # ── NEW COLUMNS ──────────────────────────────────────────
     user_id     = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"),  nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
@@ -101,8 +111,20 @@ class Dataset(Base):
     category_rel = relationship("Category", back_populates="datasets",
                                 foreign_keys=[category_id])
 
+    # Dashboard queries filter by user_id and page with ORDER BY id DESC
+    # LIMIT n; the composites let Postgres walk the index instead of
+    # seq-scanning + sorting. The trigram index for file_name ILIKE lives in
+    # migrate.py only — it needs the pg_trgm extension.
+    # ix_dataset_user_uploaded matches the profile listing's ORDER BY
+    # uploaded_at DESC, id DESC and also serves the dashboard date-range
+    # filter; on Postgres it INCLUDEs the summed counters so the profile
+    # aggregates are index-only.
     __table_args__ = (
         Index("ix_dataset_user_id", "user_id"),
+        Index("ix_dataset_user_id_desc", "user_id", desc("id")),
+        Index("ix_dataset_user_uploaded", "user_id", desc("uploaded_at"), desc("id"),
+              postgresql_include=["row_count", "duplicate_records"]),
+        Index("ix_dataset_user_content_hash", "user_id", "content_hash"),
     )
 
     @hybrid_property
@@ -114,6 +136,24 @@ class Dataset(Base):
         self.department = value
 
 
+# ================= USER STATS =================
+
+class UserStats(Base):
+    """
+    Materialised profile totals, one row per user. Rebuilt by
+    utils/user_stats.py whenever a dataset or category changes, so the
+    profile page reads one row instead of aggregating every render.
+    """
+    __tablename__ = "user_stats"
+
+    user_id          = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_datasets   = Column(Integer, default=0, nullable=False)
+    total_rows       = Column(Integer, default=0, nullable=False)
+    total_duplicates = Column(Integer, default=0, nullable=False)
+    total_categories = Column(Integer, default=0, nullable=False)
+    updated_at       = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+
 # ================= UPLOAD LOG =================
 
 class UploadLog(Base):
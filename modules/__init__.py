@@ -1,13 +1,12 @@
 """
 Modules package initialization
+
+Submodules are not imported here: utils.duplicate_detector imports
+modules.shared, and export / relation import duplicate_detector, so an
+eager import of every router from this file is a cycle for any process that
+imports duplicate_detector first (e.g. a spawned worker process). main.py
+imports each router module explicitly.
 """
-from . import dashboard
-from . import upload
-from . import view
-from . import category
-from . import relation
-from . import export
-from . import shared
 
 __all__ = [
     "dashboard",
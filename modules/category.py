@@ -20,6 +20,7 @@ from auth import get_current_user
 from database import get_db
 from models import Category, Dataset
 from utils.permissions import get_effective_user
+from utils.user_stats import refresh_user_stats
 
 router = APIRouter(tags=["category"])
 
@@ -70,6 +71,7 @@ async def create_category(
         db.add(new_category)
         db.commit()
         db.refresh(new_category)
+        refresh_user_stats(db, effective_user.id)
 
         return JSONResponse(
             status_code=200,
@@ -208,6 +210,7 @@ def delete_category(
     try:
         db.delete(category)
         db.commit()
+        refresh_user_stats(db, effective_user.id)
         return RedirectResponse("/dashboard", status_code=302)
 
     except Exception as e:
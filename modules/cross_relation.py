@@ -3,6 +3,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import Optional
 import threading
 import sqlite3
@@ -15,7 +16,7 @@ from database import get_db
 from models import Dataset, User
 from auth import get_current_user
 from utils.permissions import get_effective_user
-from modules.shared import read_file, normalize_email
+from modules.shared import read_file, normalize_email, normalize_email_series
 import re as _re
 
 
@@ -122,9 +123,41 @@ def normalize_phone(val) -> "str | None":
     return None
 
 
+def normalize_phone_series(s: "pd.Series") -> "pd.Series":
+    """
+    Column-wide normalize_phone() using pandas .str ops. A bare or
+    0-prefixed 10-digit mobile anywhere in the text wins; otherwise the
+    last 10 of 10–12 digits (which also drops a 91 / 0 prefix) or 7–9
+    digits as-is, else None.
+    """
+    txt   = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    empty = txt.str.lower().isin(('nan', 'none', '', 'null'))
+    txt   = txt.str.replace(r'\.0$', '', regex=True)
+
+    digits = txt.str.replace(_RX_NON_DIGIT, '', regex=True)
+    valid  = digits.str.len().between(7, 12) & ~empty
+    out    = digits.str[-10:].astype(object).where(valid, None)
+
+    lead0 = txt.str.extract(_RX_MOBILE_LEAD0)[1].astype(object)
+    out   = lead0.where(lead0.notna() & ~empty, out)
+    bare  = txt.str.extract(_RX_MOBILE_BARE, expand=False).astype(object)
+    return bare.where(bare.notna() & ~empty, out)
+
+
+@lru_cache(maxsize=256)
+def _classify_cols(columns: tuple) -> "tuple[tuple, str | None]":
+    """
+    Column-name scan behind _detect_cols, memoised on the header itself.
+    A dataset's header only changes when its file does, so repeat
+    drill-downs on the same file skip the regex scan entirely.
+    """
+    phone_cols = tuple(c for c in columns if _is_phone_col(c))
+    email_cols = [c for c in columns if _is_email_col(c)]
+    return phone_cols, (email_cols[0] if email_cols else None)
+
+
 def _detect_cols(df: "pd.DataFrame") -> "tuple[str | None, str | None]":
-    phone_cols = [c for c in df.columns if _is_phone_col(c)]
-    email_cols = [c for c in df.columns if _is_email_col(c)]
+    phone_cols, email_col = _classify_cols(tuple(df.columns))
     phone_col = None
     if phone_cols:
         if len(phone_cols) == 1:
@@ -140,7 +173,6 @@ def _detect_cols(df: "pd.DataFrame") -> "tuple[str | None, str | None]":
                 merged = merged.where(~needs_fill, _col_as_series(pc))
             df['__merged_phone__'] = merged
             phone_col = '__merged_phone__'
-    email_col = email_cols[0] if email_cols else None
     return phone_col, email_col
 
 
@@ -236,9 +268,9 @@ def _index_dataset(dataset_id: int, user_id: int, file_path: str, mtime: float):
     phone_col, email_col = _detect_cols(df)
 
     # Vectorised normalisation
-    phone_s = (df[phone_col].apply(normalize_phone) if phone_col
+    phone_s = (normalize_phone_series(df[phone_col]) if phone_col
                else pd.Series([None] * len(df), dtype=object))
-    email_s = (df[email_col].apply(normalize_email) if email_col
+    email_s = (normalize_email_series(df[email_col]) if email_col
                else pd.Series([None] * len(df), dtype=object))
 
     # Only keep rows with at least one value
@@ -476,6 +508,111 @@ def _paginate(items: list, page: int, per_page: int = 10):
     return items[start:start + per_page], page, total_pages
 
 
+def _index_rules_out(dataset: Dataset, phone: "str | None", email: "str | None") -> bool:
+    """
+    True when the index is current for this file and proves no row carries
+    the group key. Only keys for columns the file has are constrained, the
+    same way the pandas mask in _match_file_rows does; any doubt → False.
+    """
+    if not (phone or email):
+        return False
+    if _get_indexed_mtime(dataset.id) != _file_mtime(_resolve_path(dataset.file_path)):
+        return False
+
+    clauses, params = [], [dataset.id]
+    for col, val in (("phone_norm", phone), ("email_norm", email)):
+        if val:
+            clauses.append(
+                f"({col} = ? OR NOT EXISTS (SELECT 1 FROM cross_rel_index "
+                f"WHERE dataset_id = ? AND {col} IS NOT NULL))"
+            )
+            params += [val, dataset.id]
+    try:
+        with _get_index_conn() as conn:
+            hit = conn.execute(
+                "SELECT 1 FROM cross_rel_index WHERE dataset_id = ? AND "
+                + " AND ".join(clauses) + " LIMIT 1",
+                params,
+            ).fetchone()
+            if hit:
+                return False
+            # A file with neither column is indexed with no rows at all;
+            # the mask would then match everything, so don't rule it out.
+            return conn.execute(
+                "SELECT 1 FROM cross_rel_index WHERE dataset_id = ? LIMIT 1",
+                (dataset.id,),
+            ).fetchone() is not None
+    except Exception:
+        return False
+
+
+def _match_file_rows(dataset: Dataset, phone: "str | None", email: "str | None"):
+    """
+    Load one dataset and return (phone_col, email_col, display_cols, matched)
+    for the rows whose normalised phone/email equal the group key, or None
+    when the file is missing or nothing matches. Files the up-to-date
+    index already rules out are skipped without being read.
+    """
+    if _index_rules_out(dataset, phone, email):
+        return None
+
+    df = _load_file_df(dataset)
+    if df is None:
+        return None
+
+    phone_col, email_col = _detect_cols(df)
+
+    if phone_col:
+        df["__phone_norm__"] = normalize_phone_series(df[phone_col])
+    if email_col:
+        df["__email_norm__"] = normalize_email_series(df[email_col])
+
+    mask = pd.Series([True] * len(df), index=df.index)
+    if phone and phone_col:
+        mask = mask & (df["__phone_norm__"] == phone)
+    if email and email_col:
+        mask = mask & (df["__email_norm__"] == email)
+
+    matched = df[mask]
+    if matched.empty:
+        return None
+
+    display_cols = [c for c in matched.columns if not c.startswith("__")]
+    return phone_col, email_col, display_cols, matched
+
+
+def _coerce_cell(v):
+    """JSON/template-safe scalar: NaN → None, numpy → py, dates → str."""
+    if isinstance(v, float) and v != v:
+        return None
+    if hasattr(v, "item"):
+        return v.item()
+    if hasattr(v, "isoformat"):
+        return str(v)
+    return v
+
+
+def _rows_as_lists(frame: "pd.DataFrame") -> list:
+    """
+    Row-major list of JSON/template-safe cell values.
+
+    Converted column by column: numeric/bool columns go through
+    Series.tolist() (native Python scalars in one C pass), datetime columns
+    are stringified in bulk, and only object columns — which may hold mixed
+    types — fall back to per-cell _coerce_cell.
+    """
+    frame = frame.fillna("")
+    columns = []
+    for _, col in frame.items():
+        if col.dtype == object:
+            columns.append([_coerce_cell(v) for v in col.tolist()])
+        elif col.dtype.kind in "mM":
+            columns.append([str(v) for v in col.tolist()])
+        else:
+            columns.append(col.tolist())
+    return [list(row) for row in zip(*columns)]
+
+
 def _page_range(page: int, total_pages: int) -> list:
     pages = []
     for p in range(1, total_pages + 1):
@@ -757,9 +894,9 @@ def cross_relation_records(
             phone_col, email_col = _detect_cols(df)
 
             if phone_col:
-                df["__phone_norm__"] = df[phone_col].apply(normalize_phone)
+                df["__phone_norm__"] = normalize_phone_series(df[phone_col])
             if email_col:
-                df["__email_norm__"] = df[email_col].apply(normalize_email)
+                df["__email_norm__"] = normalize_email_series(df[email_col])
 
             mask = pd.Series([True] * len(df), index=df.index)
             if phone and phone_col:
@@ -851,41 +988,17 @@ def crf_card_detail(
     color_map = {ds.id: _color_for_index(i) for i, ds in enumerate(datasets)}
 
     # ── Build per-file record groups (same logic as /records) ────
+    # Only the first CARD_PREVIEW_LIMIT rows per file are materialised here.
     file_groups = []
     for ds in datasets:
         try:
-            df = _load_file_df(ds)
-            if df is None:
+            found = _match_file_rows(ds, phone, email)
+            if found is None:
                 continue
+            _, _, display_cols, matched = found
 
-            phone_col, email_col = _detect_cols(df)
-
-            if phone_col:
-                df["__phone_norm__"] = df[phone_col].apply(normalize_phone)
-            if email_col:
-                df["__email_norm__"] = df[email_col].apply(normalize_email)
-
-            mask = pd.Series([True] * len(df), index=df.index)
-            if phone and phone_col:
-                mask = mask & (df["__phone_norm__"] == phone)
-            if email and email_col:
-                mask = mask & (df["__email_norm__"] == email)
-
-            matched = df[mask]
-            if matched.empty:
-                continue
-
-            display_cols = [c for c in matched.columns if not c.startswith("__")]
-            records = [
-                [
-                    (None if (isinstance(v, float) and v != v)
-                     else v.item() if hasattr(v, "item")
-                     else str(v) if hasattr(v, "isoformat")
-                     else v)
-                    for v in row
-                ]
-                for row in matched[display_cols].fillna("").itertuples(index=False, name=None)
-            ]
+            total   = len(matched)
+            preview = _rows_as_lists(matched[display_cols].iloc[:CARD_PREVIEW_LIMIT])
 
             owner = db.query(User).filter_by(id=ds.user_id).first()
 
@@ -895,7 +1008,9 @@ def crf_card_detail(
                 "user_name":  (owner.full_name or owner.username) if (owner and admin_mode) else None,
                 "color":      color_map.get(ds.id, "#334155"),
                 "columns":    display_cols,
-                "records":    records,       # full list — template slices to PREVIEW_LIMIT
+                "records":    preview,                 # first PREVIEW_LIMIT rows only
+                "total":      total,
+                "rest_count": total - len(preview),
             })
 
         except Exception as exc:
@@ -910,4 +1025,4 @@ def crf_card_detail(
             "PREVIEW_LIMIT": CARD_PREVIEW_LIMIT,
             "admin_mode":    admin_mode,
         },
-    )
\ No newline at end of file
+    )
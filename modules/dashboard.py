@@ -10,25 +10,58 @@ Routes:
   POST /admin/exit-view             → admin clears user selection
 """
 
-import math
-from datetime import datetime
+import logging
+import os
+from datetime import date
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Form
+from fastapi.responses import HTMLResponse, RedirectResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, distinct
+from pydantic import BeforeValidator
 
 from auth import get_current_user
 from database import get_db
 from models import Dataset, Category, User
 from utils.permissions import get_effective_user, get_sidebar_context
+from utils.user_stats import refresh_user_stats
+from modules.relation import invalidate_dataset
 
 router = APIRouter(tags=["dashboard"])
 templates = Jinja2Templates(directory="templates")
 
 PAGE_SIZE = 10
 
+_log = logging.getLogger(__name__)
+
+
+def _blank_to_none(value):
+    """The filter form submits untouched inputs as "" — treat them as unset."""
+    return value or None
+
+
+# Typed filter params: FastAPI coerces + validates these once, so the
+# handler never re-parses raw strings.
+OptionalInt  = Annotated[Optional[int],  BeforeValidator(_blank_to_none)]
+OptionalDate = Annotated[Optional[date], BeforeValidator(_blank_to_none)]
+
+
+def _remove_dataset_files(paths: list):
+    """
+    Background task: unlink dataset files AFTER the HTTP response is sent.
+    The DB rows are already gone by then, so a slow disk never holds the
+    request worker.
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            os.remove(path)
+        except Exception as e:
+            _log.warning("Could not remove file %s: %s", path, e)
+
 
 # ---------------------------------------------------------------------------
 # Admin: select user
@@ -76,10 +109,10 @@ def dashboard(
     page: int = 1,
     q: str = "",
     category: str = "",
-    from_date: str = "",
-    to_date: str = "",
-    min_rows: str = "",
-    max_rows: str = "",
+    from_date: OptionalDate = None,
+    to_date: OptionalDate = None,
+    min_rows: OptionalInt = None,
+    max_rows: OptionalInt = None,
     has_duplicates: int = 0,
     selected_user: int = 0,
     db: Session = Depends(get_db),
@@ -111,19 +144,6 @@ def dashboard(
             if selected_user_obj:
                 selected_user_name = selected_user_obj.username
 
-        # ── Parse filter params ───────────────────────────────────────────
-        try:
-            min_rows_val = int(min_rows) if min_rows else None
-            max_rows_val = int(max_rows) if max_rows else None
-        except (ValueError, TypeError):
-            min_rows_val = max_rows_val = None
-
-        try:
-            from_date_val = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
-            to_date_val   = datetime.strptime(to_date,   "%Y-%m-%d") if to_date   else None
-        except (ValueError, TypeError):
-            from_date_val = to_date_val = None
-
         # ── Build dataset query ───────────────────────────────────────────
         # Always start from ALL datasets, then filter by selected user if chosen
         query = db.query(Dataset).join(User, Dataset.user_id == User.id)
@@ -138,14 +158,14 @@ def dashboard(
             filters.append(Dataset.file_name.ilike(f"%{q}%"))
         if category:
             filters.append(Dataset.department == category)
-        if from_date_val:
-            filters.append(Dataset.uploaded_at >= from_date_val)
-        if to_date_val:
-            filters.append(Dataset.uploaded_at <= to_date_val)
-        if min_rows_val is not None:
-            filters.append(Dataset.row_count >= min_rows_val)
-        if max_rows_val is not None:
-            filters.append(Dataset.row_count <= max_rows_val)
+        if from_date:
+            filters.append(Dataset.uploaded_at >= from_date)
+        if to_date:
+            filters.append(Dataset.uploaded_at <= to_date)
+        if min_rows is not None:
+            filters.append(Dataset.row_count >= min_rows)
+        if max_rows is not None:
+            filters.append(Dataset.row_count <= max_rows)
         if has_duplicates:
             filters.append(Dataset.duplicate_records > 0)
 
@@ -157,7 +177,7 @@ def dashboard(
 
         # ── Pagination ────────────────────────────────────────────────────
         total = query.count()
-        total_pages = max(1, math.ceil(total / PAGE_SIZE))
+        total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
         page = max(1, min(page, total_pages))
         offset = (page - 1) * PAGE_SIZE
 
@@ -199,10 +219,10 @@ def dashboard(
             "total_pages": total_pages,
             "q": q,
             "category": category,
-            "from_date": from_date_val.strftime("%Y-%m-%d") if from_date_val else "",
-            "to_date":   to_date_val.strftime("%Y-%m-%d")   if to_date_val   else "",
-            "min_rows": min_rows_val or "",
-            "max_rows": max_rows_val or "",
+            "from_date": from_date.isoformat() if from_date else "",
+            "to_date":   to_date.isoformat()   if to_date   else "",
+            "min_rows": min_rows or "",
+            "max_rows": max_rows or "",
             "has_duplicates": has_duplicates,
             "admin_mode": True,
             "viewing_user": selected_user_obj,     # None = all files, obj = specific user
@@ -222,9 +242,16 @@ def dashboard(
     # ── NORMAL USER DASHBOARD ─────────────────────────────────────────────
     user_id = effective_user.id
 
-    # Category counts (category name → dataset count) for sidebar badges
-    category_counts = dict(
-        db.query(Category.name, func.count(Dataset.id))
+    # Categories (filter dropdown), per-category counts (sidebar badges) and
+    # the unfiltered total (stats panel) in ONE round trip: the total rides
+    # along on every category row as an uncorrelated scalar subquery.
+    total_datasets_sq = (
+        db.query(func.count(Dataset.id))
+        .filter(Dataset.user_id == user_id)
+        .scalar_subquery()
+    )
+    category_rows = (
+        db.query(Category, func.count(Dataset.id), total_datasets_sq)
         .outerjoin(
             Dataset,
             and_(
@@ -233,29 +260,23 @@ def dashboard(
             ),
         )
         .filter(Category.user_id == user_id)
-        .group_by(Category.name)
+        .group_by(Category.id)
+        .order_by(Category.name)
         .all()
     )
 
-    # Total unfiltered dataset count for the stats panel
-    total_datasets = (
-        db.query(func.count(Dataset.id))
-        .filter(Dataset.user_id == user_id)
-        .scalar()
-    )
-
-    # ── Parse filter params ───────────────────────────────────────────────
-    try:
-        min_rows_val = int(min_rows) if min_rows else None
-        max_rows_val = int(max_rows) if max_rows else None
-    except (ValueError, TypeError):
-        min_rows_val = max_rows_val = None
+    user_categories = [cat for cat, _, _ in category_rows]
+    category_counts = {cat.name: cnt for cat, cnt, _ in category_rows}
 
-    try:
-        from_date_val = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
-        to_date_val   = datetime.strptime(to_date,   "%Y-%m-%d") if to_date   else None
-    except (ValueError, TypeError):
-        from_date_val = to_date_val = None
+    if category_rows:
+        total_datasets = category_rows[0][2]
+    else:
+        # No categories → no rows to carry the total; ask for it directly
+        total_datasets = (
+            db.query(func.count(Dataset.id))
+            .filter(Dataset.user_id == user_id)
+            .scalar()
+        )
 
     # ── Build filtered query ──────────────────────────────────────────────
     query = db.query(Dataset).filter(Dataset.user_id == user_id)
@@ -265,14 +286,14 @@ def dashboard(
         filters.append(Dataset.file_name.ilike(f"%{q}%"))
     if category:
         filters.append(Dataset.department == category)
-    if from_date_val:
-        filters.append(Dataset.uploaded_at >= from_date_val)
-    if to_date_val:
-        filters.append(Dataset.uploaded_at <= to_date_val)
-    if min_rows_val is not None:
-        filters.append(Dataset.row_count >= min_rows_val)
-    if max_rows_val is not None:
-        filters.append(Dataset.row_count <= max_rows_val)
+    if from_date:
+        filters.append(Dataset.uploaded_at >= from_date)
+    if to_date:
+        filters.append(Dataset.uploaded_at <= to_date)
+    if min_rows is not None:
+        filters.append(Dataset.row_count >= min_rows)
+    if max_rows is not None:
+        filters.append(Dataset.row_count <= max_rows)
     if has_duplicates:
         filters.append(Dataset.duplicate_records > 0)
 
@@ -281,7 +302,7 @@ def dashboard(
 
     # ── Pagination ────────────────────────────────────────────────────────
     total = query.count()
-    total_pages = max(1, math.ceil(total / PAGE_SIZE))
+    total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
     page = max(1, min(page, total_pages))
     offset = (page - 1) * PAGE_SIZE
 
@@ -292,14 +313,6 @@ def dashboard(
         .all()
     )
 
-    # Categories for the filter dropdown (scoped to this user)
-    user_categories = (
-        db.query(Category)
-        .filter(Category.user_id == user_id)
-        .order_by(Category.name)
-        .all()
-    )
-
     # ── Build template context ────────────────────────────────────────────
     context = {
         "request": request,
@@ -312,10 +325,10 @@ def dashboard(
         "total_pages": total_pages,
         "q": q,
         "category": category,
-        "from_date": from_date_val.strftime("%Y-%m-%d") if from_date_val else "",
-        "to_date":   to_date_val.strftime("%Y-%m-%d")   if to_date_val   else "",
-        "min_rows": min_rows_val or "",
-        "max_rows": max_rows_val or "",
+        "from_date": from_date.isoformat() if from_date else "",
+        "to_date":   to_date.isoformat()   if to_date   else "",
+        "min_rows": min_rows or "",
+        "max_rows": max_rows or "",
         "has_duplicates": has_duplicates,
         "admin_mode": False,
         "viewing_user": effective_user,
@@ -343,7 +356,7 @@ async def change_dataset_category(
     """Change the category/department of a dataset."""
     user = get_current_user(request)
     if not user:
-        return JSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
+        return ORJSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
 
     form = await request.form()
     new_category = (form.get("category") or "").strip()
@@ -355,7 +368,7 @@ async def change_dataset_category(
     ).first()
 
     if not dataset:
-        return JSONResponse({"success": False, "error": "Dataset not found"}, status_code=404)
+        return ORJSONResponse({"success": False, "error": "Dataset not found"}, status_code=404)
 
     # If a category name was provided, verify it belongs to this user
     if new_category:
@@ -364,7 +377,7 @@ async def change_dataset_category(
             Category.user_id == user["id"],
         ).first()
         if not category:
-            return JSONResponse({"success": False, "error": "Invalid category"}, status_code=400)
+            return ORJSONResponse({"success": False, "error": "Invalid category"}, status_code=400)
         dataset.department  = category.name
         dataset.category_id = category.id
     else:
@@ -373,7 +386,7 @@ async def change_dataset_category(
         dataset.category_id = None
 
     db.commit()
-    return JSONResponse({"success": True})
+    return ORJSONResponse({"success": True})
 
 
 # ---------------------------------------------------------------------------
@@ -384,16 +397,17 @@ async def change_dataset_category(
 def delete_dataset_ajax(
     dataset_id: int,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
     """Delete a dataset — AJAX version returning JSON (used by dashboard modal)."""
     user = get_current_user(request)
     if not user:
-        return JSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
+        return ORJSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
 
     # Admins cannot delete via this route
     if user.get("role") == "admin":
-        return JSONResponse({"success": False, "error": "Admins cannot delete user datasets"}, status_code=403)
+        return ORJSONResponse({"success": False, "error": "Admins cannot delete user datasets"}, status_code=403)
 
     dataset = db.query(Dataset).filter(
         Dataset.id == dataset_id,
@@ -401,20 +415,20 @@ def delete_dataset_ajax(
     ).first()
 
     if not dataset:
-        return JSONResponse({"success": False, "error": "Dataset not found"}, status_code=404)
+        return ORJSONResponse({"success": False, "error": "Dataset not found"}, status_code=404)
 
-    import os
-    if os.path.exists(dataset.file_path):
-        try:
-            os.remove(dataset.file_path)
-        except Exception as e:
-            print(f"⚠️ Could not remove file {dataset.file_path}: {e}")
+    file_path = dataset.file_path
 
     db.delete(dataset)
     db.commit()
+    refresh_user_stats(db, user["id"])
+    invalidate_dataset(dataset_id)
+
+    # Unlink after the commit lands — off the request path
+    background_tasks.add_task(_remove_dataset_files, [file_path])
 
-    print(f"🗑️ Deleted dataset {dataset_id} for user {user['id']}")
-    return JSONResponse({"success": True})
+    _log.info("Deleted dataset %s for user %s", dataset_id, user["id"])
+    return ORJSONResponse({"success": True})
 
 
 # ---------------------------------------------------------------------------
@@ -424,27 +438,28 @@ def delete_dataset_ajax(
 @router.post("/dataset/bulk-delete")
 async def bulk_delete_datasets(
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
     """Bulk delete datasets by ID list — used by the bulk delete toolbar."""
     user = get_current_user(request)
     if not user:
-        return JSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
+        return ORJSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
 
     if user.get("role") == "admin":
-        return JSONResponse({"success": False, "error": "Admins cannot delete user datasets"}, status_code=403)
+        return ORJSONResponse({"success": False, "error": "Admins cannot delete user datasets"}, status_code=403)
 
     try:
         body = await request.json()
         ids  = body.get("ids", [])
     except Exception:
-        return JSONResponse({"success": False, "error": "Invalid request body"}, status_code=400)
+        return ORJSONResponse({"success": False, "error": "Invalid request body"}, status_code=400)
 
     if not ids:
-        return JSONResponse({"success": False, "error": "No IDs provided"}, status_code=400)
+        return ORJSONResponse({"success": False, "error": "No IDs provided"}, status_code=400)
 
-    import os
     deleted = 0
+    file_paths = []
     for dataset_id in ids:
         dataset = db.query(Dataset).filter(
             Dataset.id == dataset_id,
@@ -452,14 +467,17 @@ async def bulk_delete_datasets(
         ).first()
         if not dataset:
             continue
-        if os.path.exists(dataset.file_path):
-            try:
-                os.remove(dataset.file_path)
-            except Exception as e:
-                print(f"⚠️ Could not remove file {dataset.file_path}: {e}")
+        file_paths.append(dataset.file_path)
         db.delete(dataset)
         deleted += 1
 
     db.commit()
-    print(f"🗑️ Bulk deleted {deleted} datasets for user {user['id']}")
-    return JSONResponse({"success": True, "deleted": deleted})
\ No newline at end of file
+    if deleted:
+        refresh_user_stats(db, user["id"])
+    for dataset_id in ids:
+        invalidate_dataset(dataset_id)
+
+    if file_paths:
+        background_tasks.add_task(_remove_dataset_files, file_paths)
+    _log.info("Bulk deleted %d datasets for user %s", deleted, user["id"])
+    return ORJSONResponse({"success": True, "deleted": deleted})
\ No newline at end of file
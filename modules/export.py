@@ -1,21 +1,30 @@
 """
 Data export routes (CSV, Excel, PDF)
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
+from functools import lru_cache
+from urllib.parse import quote
+import csv
+import io
 import os
+import threading
 import pandas as pd
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from openpyxl import Workbook
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 
 from auth import get_current_user
 from database import get_db
 from models import Dataset, DuplicateRelation
+from modules import shared
 from modules.shared import (
-    CLEAN_DIR, DUPLICATE_CACHE, read_dataset_file,
-    get_cached_df, set_cached_df, read_file, normalize_phone, normalize_email
+    read_dataset_file,
+    get_cached_df, set_cached_df, read_file, normalize_phone_series, normalize_email_series,
+    detect_contact_cols,
 )
 from utils.permissions import get_effective_user
 from utils.duplicate_detector import extract_duplicate_contacts
@@ -23,20 +32,39 @@ from utils.duplicate_detector import extract_duplicate_contacts
 router = APIRouter(prefix="/export", tags=["export"])
 
 
-@router.get("/csv/{dataset_id}")
-def export_clean_csv(dataset_id: int, request: Request, db: Session = Depends(get_db)):
-    """Export clean data as CSV (duplicates removed)"""
-    # ✅ Check authentication
-    user = get_current_user(request)
-    if not user:
-        return RedirectResponse("/login", status_code=302)
-    
-    # Get effective user
+# Cleaned (deduplicated) frames shared by the CSV / Excel / PDF exports so
+# back-to-back exports of one dataset clean it only once.
+# dataset_id -> (file mtime, cleaned DataFrame); a newer mtime rebuilds it.
+# Bounded: every entry is a whole DataFrame and the view page pre-warms it.
+CLEAN_CACHE_MAX = 4
+_CLEAN_CACHE = shared.LRUCache(CLEAN_CACHE_MAX)
+# dataset_id -> Lock, so concurrent exports of one dataset clean it once
+# (the others wait and read the cached frame) instead of each recomputing.
+_CLEAN_LOCKS: dict = {}
+
+# Rows per to_csv batch — bounds the writer's buffer on very large exports
+CSV_CHUNK_ROWS = 100_000
+
+# DuplicateRelation rows fetched per round trip when streaming the export
+RELATION_FETCH_ROWS = 10_000
+
+# Duplicate-relation extractions kept in memory (least recently used evicted)
+RELATIONS_CACHE_MAX = 32
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# PDF is for reading, not bulk transfer — larger tables belong in CSV/Excel
+PDF_MAX_ROWS = 50_000
+# Column widths are measured on this many leading rows, not the whole table
+PDF_WIDTH_SAMPLE_ROWS = 1_000
+PDF_FONT_SIZE = 8
+
+def _get_export_dataset(dataset_id: int, request: Request, db: Session) -> Dataset:
+    """Fetch the dataset scoped to the effective user, or raise 403/404."""
     effective_user = get_effective_user(request, db)
     if not effective_user:
         raise HTTPException(status_code=403, detail="Select a user first")
     
-    # Fetch dataset scoped to effective user
     dataset = db.query(Dataset).filter(
         Dataset.id == dataset_id,
         Dataset.user_id == effective_user.id
@@ -45,7 +73,11 @@ def export_clean_csv(dataset_id: int, request: Request, db: Session = Depends(ge
     if not dataset:
         raise HTTPException(status_code=404)
     
-    # Load dataframe from cache or file
+    return dataset
+
+
+def _load_dataset_df(dataset: Dataset) -> pd.DataFrame:
+    """Load dataframe from cache or file."""
     df = get_cached_df(dataset.file_name)
     
     if df is None:
@@ -57,7 +89,6 @@ def export_clean_csv(dataset_id: int, request: Request, db: Session = Depends(ge
             )
         
         try:
-            from modules.shared import read_file
             df = read_file(dataset.file_path)
             set_cached_df(dataset.file_name, df)
         except Exception as e:
@@ -66,43 +97,169 @@ def export_clean_csv(dataset_id: int, request: Request, db: Session = Depends(ge
                 detail=f"Failed to read dataset file: {str(e)}"
             )
     
-    # Remove duplicates - KEEP FIRST OCCURRENCE
-    df_copy = df.copy()
-    
-    # Find phone and email columns
-    phone_col = None
-    email_col = None
-    
-    for col in df_copy.columns:
-        col_lower = str(col).lower().strip()
-        if not phone_col and any(k in col_lower for k in ["phone", "mobile", "contact", "tel", "cell"]):
-            phone_col = col
-        if not email_col and any(k in col_lower for k in ["email", "mail", "e-mail"]):
-            email_col = col
+    return df
+
+
+def _detect_export_cols(dataset: Dataset, columns) -> tuple:
+    """
+    Phone / email columns stored on the dataset at upload. Falls back to a
+    header scan for rows uploaded before those fields existed, or when a
+    stored name is no longer among the file's columns.
+    """
+    stored = (dataset.phone_col, dataset.email_col)
+    if any(stored) and all(c is None or c in columns for c in stored):
+        return stored
+    return detect_contact_cols(columns)
+
+
+def _pdf_col_widths(header: list, rows: list) -> list:
+    """Width per column from the header and a leading sample of rows."""
+    widths = []
+    sample = rows[:PDF_WIDTH_SAMPLE_ROWS]
+    for i, name in enumerate(header):
+        longest = max([name] + [r[i] for r in sample], key=len)
+        widths.append(stringWidth(longest, "Helvetica", PDF_FONT_SIZE) + 6)   # + cell padding
+    return widths
+
+
+def _get_clean_df(dataset: Dataset) -> pd.DataFrame:
+    """
+    Dataset with duplicates removed (first occurrence kept on phone/email)
+    and internal __dup_* marker columns stripped. Memoised per dataset
+    until the file's mtime changes.
+    """
+    try:
+        mtime = os.path.getmtime(dataset.file_path)
+    except OSError:
+        mtime = 0.0
+    
+    cached = _CLEAN_CACHE.get(dataset.id)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    with _CLEAN_LOCKS.setdefault(dataset.id, threading.Lock()):
+        cached = _CLEAN_CACHE.get(dataset.id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        df_clean = _build_clean_df(dataset)
+        _CLEAN_CACHE[dataset.id] = (mtime, df_clean)
+    return df_clean
+
+
+def forget_clean_df(dataset_id: int):
+    """Drop a dataset's cached cleaned frame and its lock (deleted / re-processed)."""
+    _CLEAN_CACHE.pop(dataset_id)
+    _CLEAN_LOCKS.pop(dataset_id, None)
+
+
+def _build_clean_df(dataset: Dataset) -> pd.DataFrame:
+    """Uncached body of _get_clean_df()."""
+    df = _load_dataset_df(dataset)
     
-    # Build subset for duplicate detection
-    subset = []
-    if phone_col:
-        subset.append(phone_col)
-    if email_col:
-        subset.append(email_col)
+    phone_col, email_col = _detect_export_cols(dataset, df.columns)
+    subset = [c for c in (phone_col, email_col) if c]
     
-    # Drop duplicates keeping first occurrence
-    if subset:
-        df_clean = df_copy.drop_duplicates(subset=subset, keep='first')
-    else:
-        # If no phone/email columns found, just return original data
-        df_clean = df_copy
+    # drop_duplicates already returns a new frame — no defensive copy needed.
+    # If no phone/email columns found, just return original data
+    df_clean = df.drop_duplicates(subset=subset, keep='first') if subset else df
     
     # Remove internal duplicate marker columns if they exist
     dup_cols = [c for c in df_clean.columns if c.startswith("__dup_") or c == "__is_duplicate__"]
     if dup_cols:
         df_clean = df_clean.drop(columns=dup_cols)
     
-    path = os.path.join(CLEAN_DIR, f"CLEAN_{dataset.file_name}.csv")
-    df_clean.to_csv(path, index=False)
+    return df_clean
+
+
+@lru_cache(maxsize=RELATIONS_CACHE_MAX)
+def _extract_relations(dataset_id: int, file_path: str, mtime: float) -> dict:
+    """
+    extract_duplicate_contacts() memoised per file version — a changed
+    mtime is a new key, so edits to the file are never served stale.
+    """
+    file_ext = os.path.splitext(file_path)[1].lower().replace(".", "")
+    return extract_duplicate_contacts(file_path, file_ext)
+
+
+def _attachment(filename: str) -> dict:
+    """Content-Disposition header for a download, as FileResponse builds it."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return {"Content-Disposition": f"attachment; filename*=utf-8''{quoted}"}
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def _iter_csv(df: pd.DataFrame):
+    """CSV text of df in CSV_CHUNK_ROWS slices, header on the first only."""
+    if df.empty:
+        yield df.to_csv(index=False, lineterminator="\n")
+        return
+    for start in range(0, len(df), CSV_CHUNK_ROWS):
+        yield df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(
+            index=False, header=(start == 0), lineterminator="\n"
+        )
+
+
+def _write_xlsx(df: pd.DataFrame, target):
+    """
+    Write df to .xlsx (a path or binary buffer) with an openpyxl write-only
+    workbook: rows are streamed to the sheet instead of building a styled
+    cell matrix in memory the way to_excel does. Missing values become
+    empty cells.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([str(c) for c in df.columns])
+    
+    columns = [
+        col.astype(object).where(col.notna(), None).tolist()
+        for _, col in df.items()
+    ]
+    for row in zip(*columns):
+        ws.append(row)
+    
+    wb.save(target)
+
+
+@router.post("/prepare/{dataset_id}")
+def prepare_export(
+    dataset_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    """
+    Warm the cleaned frame in the background (the view page calls this when
+    the export panel opens) so the CSV / Excel / PDF downloads that follow
+    only serialize it.
+    """
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    dataset = _get_export_dataset(dataset_id, request, db)
+    background_tasks.add_task(_get_clean_df, dataset)
     
-    return FileResponse(path, filename=os.path.basename(path))
+    return {"success": True}
+
+
+@router.get("/csv/{dataset_id}")
+def export_clean_csv(dataset_id: int, request: Request, db: Session = Depends(get_db)):
+    """Export clean data as CSV (duplicates removed)"""
+    # ✅ Check authentication
+    user = get_current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=302)
+    
+    dataset  = _get_export_dataset(dataset_id, request, db)
+    df_clean = _get_clean_df(dataset)
+    
+    # Streamed straight to the client — no temp file on disk
+    return StreamingResponse(
+        _iter_csv(df_clean),
+        media_type="text/csv",
+        headers=_attachment(f"CLEAN_{dataset.file_name}.csv"),
+    )
 
 
 @router.get("/excel/{dataset_id}")
@@ -113,78 +270,17 @@ def export_clean_excel(dataset_id: int, request: Request, db: Session = Depends(
     if not user:
         return RedirectResponse("/login", status_code=302)
     
-    # Get effective user
-    effective_user = get_effective_user(request, db)
-    if not effective_user:
-        raise HTTPException(status_code=403, detail="Select a user first")
-    
-    # Fetch dataset scoped to effective user
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id,
-        Dataset.user_id == effective_user.id
-    ).first()
-    
-    if not dataset:
-        raise HTTPException(status_code=404)
+    dataset  = _get_export_dataset(dataset_id, request, db)
+    df_clean = _get_clean_df(dataset)
     
-    # Load dataframe from cache or file
-    df = get_cached_df(dataset.file_name)
+    buf = io.BytesIO()
+    _write_xlsx(df_clean, buf)
     
-    if df is None:
-        # Cache miss - reload from file
-        if not os.path.exists(dataset.file_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Dataset file not found: {dataset.file_path}"
-            )
-        
-        try:
-            from modules.shared import read_file
-            df = read_file(dataset.file_path)
-            set_cached_df(dataset.file_name, df)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to read dataset file: {str(e)}"
-            )
-    
-    # Remove duplicates - KEEP FIRST OCCURRENCE
-    df_copy = df.copy()
-    
-    # Find phone and email columns
-    phone_col = None
-    email_col = None
-    
-    for col in df_copy.columns:
-        col_lower = str(col).lower().strip()
-        if not phone_col and any(k in col_lower for k in ["phone", "mobile", "contact", "tel", "cell"]):
-            phone_col = col
-        if not email_col and any(k in col_lower for k in ["email", "mail", "e-mail"]):
-            email_col = col
-    
-    # Build subset for duplicate detection
-    subset = []
-    if phone_col:
-        subset.append(phone_col)
-    if email_col:
-        subset.append(email_col)
-    
-    # Drop duplicates keeping first occurrence
-    if subset:
-        df_clean = df_copy.drop_duplicates(subset=subset, keep='first')
-    else:
-        # If no phone/email columns found, just return original data
-        df_clean = df_copy
-    
-    # Remove internal duplicate marker columns if they exist
-    dup_cols = [c for c in df_clean.columns if c.startswith("__dup_") or c == "__is_duplicate__"]
-    if dup_cols:
-        df_clean = df_clean.drop(columns=dup_cols)
-    
-    path = os.path.join(CLEAN_DIR, f"CLEAN_{dataset.file_name}.xlsx")
-    df_clean.to_excel(path, index=False)
-    
-    return FileResponse(path, filename=os.path.basename(path))
+    return Response(
+        buf.getvalue(),
+        media_type=XLSX_MEDIA_TYPE,
+        headers=_attachment(f"CLEAN_{dataset.file_name}.xlsx"),
+    )
 
 
 @router.get("/pdf/{dataset_id}")
@@ -195,87 +291,30 @@ def export_clean_pdf(dataset_id: int, request: Request, db: Session = Depends(ge
     if not user:
         return RedirectResponse("/login", status_code=302)
     
-    # Get effective user
-    effective_user = get_effective_user(request, db)
-    if not effective_user:
-        raise HTTPException(status_code=403, detail="Select a user first")
-    
-    # Fetch dataset scoped to effective user
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id,
-        Dataset.user_id == effective_user.id
-    ).first()
+    dataset  = _get_export_dataset(dataset_id, request, db)
+    df_clean = _get_clean_df(dataset)
     
-    if not dataset:
-        raise HTTPException(status_code=404)
+    # Pre-stringify so ReportLab doesn't coerce cell by cell; blanks for NaN
+    head = df_clean.head(PDF_MAX_ROWS)
+    header = [str(c) for c in head.columns]
+    rows = head.astype(object).where(head.notna(), "").astype(str).values.tolist()
     
-    # Load dataframe from cache or file
-    df = get_cached_df(dataset.file_name)
-    
-    if df is None:
-        # Cache miss - reload from file
-        if not os.path.exists(dataset.file_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Dataset file not found: {dataset.file_path}"
-            )
-        
-        try:
-            from modules.shared import read_file
-            df = read_file(dataset.file_path)
-            set_cached_df(dataset.file_name, df)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to read dataset file: {str(e)}"
-            )
-    
-    # Remove duplicates - KEEP FIRST OCCURRENCE
-    df_copy = df.copy()
-    
-    # Find phone and email columns
-    phone_col = None
-    email_col = None
-    
-    for col in df_copy.columns:
-        col_lower = str(col).lower().strip()
-        if not phone_col and any(k in col_lower for k in ["phone", "mobile", "contact", "tel", "cell"]):
-            phone_col = col
-        if not email_col and any(k in col_lower for k in ["email", "mail", "e-mail"]):
-            email_col = col
-    
-    # Build subset for duplicate detection
-    subset = []
-    if phone_col:
-        subset.append(phone_col)
-    if email_col:
-        subset.append(email_col)
-    
-    # Drop duplicates keeping first occurrence
-    if subset:
-        df_clean = df_copy.drop_duplicates(subset=subset, keep='first')
-    else:
-        # If no phone/email columns found, just return original data
-        df_clean = df_copy
-    
-    # Remove internal duplicate marker columns if they exist
-    dup_cols = [c for c in df_clean.columns if c.startswith("__dup_") or c == "__is_duplicate__"]
-    if dup_cols:
-        df_clean = df_clean.drop(columns=dup_cols)
-    
-    pdf_path = os.path.join(CLEAN_DIR, f"CLEAN_{dataset.file_name}.pdf")
-    
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    table = Table([df_clean.columns.tolist()] + df_clean.values.tolist(), repeatRows=1)
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4)
+    table = LongTable([header] + rows, repeatRows=1, colWidths=_pdf_col_widths(header, rows))
     table.setStyle(TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
         ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("FONTSIZE", (0, 0), (-1, -1), PDF_FONT_SIZE),
     ]))
     
     doc.build([table])
     
-    return FileResponse(pdf_path, filename=os.path.basename(pdf_path))
+    return Response(
+        buf.getvalue(),
+        media_type="application/pdf",
+        headers=_attachment(f"CLEAN_{dataset.file_name}.pdf"),
+    )
 
 
 @router.get("/relations/csv/{dataset_id}")
@@ -286,37 +325,25 @@ def export_duplicate_csv(dataset_id: int, request: Request, db: Session = Depend
     if not user:
         return RedirectResponse("/login", status_code=302)
     
-    # Get effective user
-    effective_user = get_effective_user(request, db)
-    if not effective_user:
-        raise HTTPException(status_code=403, detail="Select a user first")
-    
-    # Fetch dataset scoped to effective user
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id,
-        Dataset.user_id == effective_user.id
-    ).first()
-    
-    if not dataset:
-        raise HTTPException(status_code=404)
+    _get_export_dataset(dataset_id, request, db)
     
-    relations = db.query(DuplicateRelation).filter(
+    # Plain column tuples streamed off a server-side cursor in batches —
+    # no ORM objects and no full result list held in memory
+    relations = db.query(
+        DuplicateRelation.phone,
+        DuplicateRelation.email,
+        DuplicateRelation.user_names,
+        DuplicateRelation.user_count,
+    ).filter(
         DuplicateRelation.dataset_id == dataset_id
-    ).all()
-    
-    df = pd.DataFrame([
-        {
-            "Phone": r.phone,
-            "Email": r.email,
-            "User Names": r.user_names,
-            "User Count": r.user_count
-        }
-        for r in relations
-    ])
+    ).execution_options(stream_results=True).yield_per(RELATION_FETCH_ROWS)
     
     path = f"exports/duplicate_relations_{dataset_id}.csv"
     os.makedirs("exports", exist_ok=True)
-    df.to_csv(path, index=False)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Phone", "Email", "User Names", "User Count"])
+        writer.writerows(relations)
     
     return FileResponse(path, filename=f"duplicate_relations_{dataset_id}.csv")
 
@@ -343,15 +370,15 @@ def export_clean_using_relations(dataset_id: int, request: Request, db: Session
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
-    # Build duplicate cache if missing
-    if dataset_id not in DUPLICATE_CACHE:
-        file_ext = os.path.splitext(dataset.file_path)[1].lower().replace(".", "")
-        DUPLICATE_CACHE[dataset_id] = extract_duplicate_contacts(
-            dataset.file_path,
-            file_ext
+    try:
+        mtime = os.path.getmtime(dataset.file_path)
+    except OSError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dataset file not found: {dataset.file_path}"
         )
     
-    relations = DUPLICATE_CACHE.get(dataset_id)
+    relations = _extract_relations(dataset_id, dataset.file_path, mtime)
     
     if not relations:
         raise HTTPException(
@@ -361,65 +388,29 @@ def export_clean_using_relations(dataset_id: int, request: Request, db: Session
     
     # Load original file
     df = read_dataset_file(dataset.file_path)
-    df.columns = df.columns.str.lower().str.strip()
     
-    # Find phone / email columns
-    phone_col = None
-    email_col = None
-    
-    for c in df.columns:
-        lc = c.lower()
-        
-        if not phone_col and any(
-            k in lc for k in ["phone", "mobile", "contact", "cell", "tel", "contactno", "phoneno"]
-        ):
-            phone_col = c
-        
-        if not email_col and any(
-            k in lc for k in ["email", "mail", "emailid", "e-mail", "emailaddress"]
-        ):
-            email_col = c
+    # Find phone / email columns, then match them to the lowercased headers
+    phone_col, email_col = _detect_export_cols(dataset, df.columns)
+    df.columns = df.columns.str.lower().str.strip()
+    phone_col = str(phone_col).lower().strip() if phone_col else None
+    email_col = str(email_col).lower().strip() if email_col else None
     
     # Normalize data
     if phone_col:
-        df[phone_col] = df[phone_col].apply(normalize_phone)
+        df[phone_col] = normalize_phone_series(df[phone_col])
     
     if email_col:
-        df[email_col] = df[email_col].apply(normalize_email)
-    
-    # Build duplicate keys
-    duplicate_keys = set()
+        df[email_col] = normalize_email_series(df[email_col])
     
-    for mode in ["combined", "phone", "email"]:
-        for r in relations.get(mode, []):
-            phone = r.get("phone") or ""
-            email = r.get("email") or ""
-            duplicate_keys.add((phone, email))
+    # Remove extra duplicates - KEEP FIRST OCCURRENCE
+    subset = [c for c in (phone_col, email_col) if c]
+    clean_df = df.drop_duplicates(subset=subset, keep="first") if subset else df
     
-    # Remove extra duplicates
-    seen = set()
-    clean_rows = []
+    buf = io.BytesIO()
+    _write_xlsx(clean_df, buf)
     
-    for _, row in df.iterrows():
-        phone = row.get(phone_col) if phone_col else ""
-        email = row.get(email_col) if email_col else ""
-        
-        key = (phone, email)
-        
-        # Keep first occurrence only
-        if key not in seen:
-            seen.add(key)
-            clean_rows.append(row)
-    
-    clean_df = pd.DataFrame(clean_rows)
-    
-    # Save file
-    filename = f"CLEAN_RELATION_{dataset.file_name}.xlsx"
-    path = os.path.join(CLEAN_DIR, filename)
-    clean_df.to_excel(path, index=False)
-    
-    return FileResponse(
-        path,
-        filename=filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
\ No newline at end of file
+    return Response(
+        buf.getvalue(),
+        media_type=XLSX_MEDIA_TYPE,
+        headers=_attachment(f"CLEAN_RELATION_{dataset.file_name}.xlsx"),
+    )
@@ -12,11 +12,11 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from auth import get_current_user
 from database import get_db
-from models import Dataset, Category, User
+from models import Dataset, User
+from utils.user_stats import get_user_stats
 
 router = APIRouter(tags=["profile"])
 templates = Jinja2Templates(directory="templates")
@@ -50,40 +50,18 @@ def profile(
         .all()
     )
 
-    # ── Aggregate stats ─────────────────────────────────────────────────────
-    total_datasets = (
-        db.query(func.count(Dataset.id))
-        .filter(Dataset.user_id == user_id)
-        .scalar() or 0
-    )
-
-    total_rows = (
-        db.query(func.coalesce(func.sum(Dataset.row_count), 0))
-        .filter(Dataset.user_id == user_id)
-        .scalar() or 0
-    )
-
-    total_duplicates = (
-        db.query(func.coalesce(func.sum(Dataset.duplicate_records), 0))
-        .filter(Dataset.user_id == user_id)
-        .scalar() or 0
-    )
-
-    total_categories = (
-        db.query(func.count(Category.id))
-        .filter(Category.user_id == user_id)
-        .scalar() or 0
-    )
+    # ── Aggregate stats (materialised; see utils/user_stats.py) ───────────
+    stats = get_user_stats(db, user_id)
 
     # ── Build context ────────────────────────────────────────────────────────
     context = {
         "request": request,
         "user": current_user,          # full ORM object (has .created_at, .last_login, etc.)
         "datasets": datasets,
-        "total_datasets": total_datasets,
-        "total_rows": total_rows,
-        "total_duplicates": total_duplicates,
-        "total_categories": total_categories,
+        "total_datasets": stats.total_datasets,
+        "total_rows": stats.total_rows,
+        "total_duplicates": stats.total_duplicates,
+        "total_categories": stats.total_categories,
         "show_header": True,
         "show_sidebar": False,
         # sidebar not needed on profile, but base.html needs these to avoid errors
@@ -1,8 +1,12 @@
 import os
+import pickle
+import time
 import traceback
+import numpy as np
+import orjson
 import pandas as pd
 from pathlib import Path
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
@@ -11,20 +15,33 @@ from auth import get_current_user
 from database import get_db
 from models import Dataset
 from modules import shared
+from modules.export import forget_clean_df
 from utils.permissions import get_effective_user
 from utils.duplicate_detector import (
     extract_duplicate_contacts,
+    extract_duplicate_contacts_from_df,
     normalize_phone_public,
     normalize_email_public,
+    normalize_phone_public_series,
+    normalize_email_public_series,
 )
 
 router = APIRouter(tags=["relation"])
 templates = Jinja2Templates(directory="templates")
 
-# In-memory caches
-DUPLICATE_CACHE: dict = {}
-DATASET_CACHE:   dict = {}
-LOOKUP_CACHE:    dict = {}
+# In-memory caches — bounded LRUs. DUPLICATE_CACHE / DATASET_CACHE entries
+# carry the source file's mtime and are rebuilt when it changes; LOOKUP_CACHE
+# keys include that mtime. invalidate_dataset() drops all three explicitly.
+DUPLICATE_CACHE = shared.LRUCache(maxsize=64)     # dataset_id -> (mtime, strict modes, error)
+DATASET_CACHE   = shared.LRUCache(maxsize=16)     # dataset_id -> {"mtime", "df", ...}
+LOOKUP_CACHE    = shared.LRUCache(maxsize=4096)   # (dataset_id, mtime, phone, email) -> result
+SOURCE_CACHE    = shared.LRUCache(maxsize=4)      # (dataset_id, mtime) -> raw read_file() frame
+SEARCH_CACHE    = shared.LRUCache(maxsize=256)    # (dataset_id, mtime, mode, search) -> filtered list
+
+# Extraction state lives next to the persisted modes so every worker sees
+# it: <id>_<mtime>.json (done), .err (failed), .pending (claimed by the
+# worker running it). A claim older than this is from a worker that died.
+PENDING_STALE_SECONDS = 30 * 60
 
 PAGE_SIZE   = 10
 VALID_MODES = {"combined", "phone", "email"}
@@ -32,6 +49,13 @@ VALID_MODES = {"combined", "phone", "email"}
 # Project root — used to resolve relative file paths stored in the DB
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Strict-mode results (<dataset_id>_<mtime>.json) and the drill-down frame
+# (<dataset_id>_<mtime>.pkl) are persisted here. They survive restarts and are
+# shared by every worker process on the host, so each file version is parsed
+# once rather than once per worker.
+RELATION_CACHE_DIR = BASE_DIR / "cache" / "relations"
+RELATION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
 
 def _resolve_path(raw_path: str) -> str:
     """
@@ -46,12 +70,218 @@ def _resolve_path(raw_path: str) -> str:
     return str(resolved)
 
 
-def safe_val(v):
-    if v is None:
-        return ""
-    if isinstance(v, float):
-        return ""
-    return str(v).strip()
+def _source_path(abs_path: str) -> str:
+    """
+    Prefer the cleaned copy if it exists (see shared.cleaned_path_for);
+    load it with shared.read_cleaned().
+    """
+    return shared.cleaned_path_for(abs_path) or abs_path
+
+
+def _mtime(path: str):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _modes_file(dataset_id: int, mtime: float, suffix: str = ".json") -> Path:
+    return RELATION_CACHE_DIR / f"{dataset_id}_{int(mtime * 1_000_000)}{suffix}"
+
+
+def _drop_modes_files(dataset_id: int, suffix: str = ".json"):
+    for f in RELATION_CACHE_DIR.glob(f"{dataset_id}_*{suffix}"):
+        f.unlink(missing_ok=True)
+
+
+def _load_modes(dataset_id: int, mtime):
+    """Persisted strict modes for this file version, or None."""
+    if mtime is None:
+        return None
+    try:
+        return orjson.loads(_modes_file(dataset_id, mtime).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def _save_modes(dataset_id: int, mtime, modes: dict):
+    """Replace any older version's file with this one (atomic rename)."""
+    if mtime is None:
+        return
+    try:
+        _drop_modes_files(dataset_id)
+        path = _modes_file(dataset_id, mtime)
+        tmp  = path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(modes, default=str))
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Could not persist relation cache for dataset {dataset_id}: {e}")
+
+
+def _save_error(dataset_id: int, mtime, error: str):
+    """Persist an extraction error for this file version (atomic rename)."""
+    if mtime is None:
+        return
+    try:
+        _drop_modes_files(dataset_id, ".err")
+        path = _modes_file(dataset_id, mtime, ".err")
+        tmp  = path.with_suffix(".errtmp")
+        tmp.write_text(error, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Could not persist relation error for dataset {dataset_id}: {e}")
+
+
+def _load_error(dataset_id: int, mtime):
+    """Persisted extraction error for this file version, or None."""
+    if mtime is None:
+        return None
+    try:
+        return _modes_file(dataset_id, mtime, ".err").read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _pending_age(dataset_id: int, mtime):
+    """Seconds since this file version's extraction was claimed, or None."""
+    try:
+        return time.time() - _modes_file(dataset_id, mtime, ".pending").stat().st_mtime
+    except OSError:
+        return None
+
+
+def _claim_extraction(dataset_id: int, mtime) -> bool:
+    """
+    Create the .pending marker for this file version. False when a live
+    claim already exists — some worker is extracting it. Stale claims are
+    taken over.
+    """
+    if mtime is None:
+        return True
+    path = _modes_file(dataset_id, mtime, ".pending")
+    age  = _pending_age(dataset_id, mtime)
+    if age is not None and age > PENDING_STALE_SECONDS:
+        path.unlink(missing_ok=True)
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        return True          # can't coordinate through disk — just run it
+
+
+def _read_source(dataset_id: int, load_path: str, raw_path: str, mtime) -> pd.DataFrame:
+    """
+    shared.read_cleaned() memoized per file version, so the relation page
+    and the drill-down parse a cold file once between them. Callers must
+    not modify the returned frame in place.
+    """
+    key = (dataset_id, mtime)
+    df  = SOURCE_CACHE.get(key)
+    if df is None:
+        df = shared.read_cleaned(load_path, raw_path)
+        SOURCE_CACHE[key] = df
+    return df
+
+
+def _extract_modes(dataset_id: int, load_path: str, raw_path: str, mtime):
+    """
+    Background job: parse the file, build strict modes, cache and persist
+    them. The relation page polls /relations/status until this finishes.
+    """
+    load_ext = Path(load_path).suffix.lower().replace(".", "")
+    error    = None
+    try:
+        if load_ext == "zip":
+            raw = extract_duplicate_contacts(load_path, load_ext)
+        else:
+            raw = extract_duplicate_contacts_from_df(_read_source(dataset_id, load_path, raw_path, mtime))
+        modes = _build_strict_modes(raw)
+        _save_modes(dataset_id, mtime, modes)
+    except Exception as e:
+        error = (
+            f"{type(e).__name__}: {e}\n\n"
+            f"File: {load_path}\n\n"
+            f"{traceback.format_exc()}"
+        )
+        modes = {"combined": [], "phone": [], "email": []}
+        _save_error(dataset_id, mtime, error)
+    DUPLICATE_CACHE[dataset_id] = (mtime, modes, error)
+    if mtime is not None:
+        _modes_file(dataset_id, mtime, ".pending").unlink(missing_ok=True)
+
+
+def _load_frame(dataset_id: int, mtime):
+    """Persisted DATASET_CACHE entry for this file version, or None."""
+    if mtime is None:
+        return None
+    path = _modes_file(dataset_id, mtime, ".pkl")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Truncated, or written by another pandas / numpy version
+        # (AttributeError, ModuleNotFoundError, TypeError, ...): rebuild it
+        print(f"⚠️ Discarding unreadable drill-down cache for dataset {dataset_id}: {e}")
+        path.unlink(missing_ok=True)
+        return None
+
+
+def _save_frame(dataset_id: int, mtime, cache_data: dict):
+    """Same replace-then-rename as _save_modes, for the drill-down frame."""
+    if mtime is None:
+        return
+    path = _modes_file(dataset_id, mtime, ".pkl")
+    tmp  = path.with_suffix(".pkl.tmp")
+    try:
+        _drop_modes_files(dataset_id, ".pkl")
+        with open(tmp, "wb") as f:
+            pickle.dump(cache_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        # Persisting is best effort — the in-memory entry is already built
+        print(f"⚠️ Could not persist drill-down cache for dataset {dataset_id}: {e}")
+        tmp.unlink(missing_ok=True)
+
+
+def invalidate_dataset(dataset_id: int):
+    """Forget everything cached for a dataset (deleted / re-processed)."""
+    DUPLICATE_CACHE.pop(dataset_id)
+    DATASET_CACHE.pop(dataset_id)
+    LOOKUP_CACHE.discard_where(lambda key: key[0] == dataset_id)
+    SOURCE_CACHE.discard_where(lambda key: key[0] == dataset_id)
+    SEARCH_CACHE.discard_where(lambda key: key[0] == dataset_id)
+    for suffix in (".json", ".pkl", ".err", ".pending"):
+        _drop_modes_files(dataset_id, suffix)
+    forget_clean_df(dataset_id)
+
+
+def _display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drill-down display values, a column at a time: None / float cells
+    become "", everything else str(v).strip(). Done once when DATASET_CACHE
+    is built so drill-down lookups only slice and call to_dict.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_float_dtype(s.dtype):
+            out[col] = np.full(len(s), "", dtype=object)
+            continue
+        values = s.to_numpy(dtype=object)
+        text   = s.astype(object).astype(str)
+        nulls  = text.isna().to_numpy()
+        if nulls.any():   # astype(str) keeps NaT / pd.NA as missing; str() doesn't
+            text[nulls] = [str(v) for v in values[nulls]]
+        text   = text.str.strip().to_numpy(dtype=object)
+        blank  = np.fromiter(
+            (v is None or isinstance(v, float) for v in values), dtype=bool, count=len(values)
+        )
+        out[col] = np.where(blank, "", text)
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
 
 
 def _build_strict_modes(raw: dict) -> dict:
@@ -66,8 +296,10 @@ def _build_strict_modes(raw: dict) -> dict:
       email records → include 'phones' list (all phones in that email group)
 
     This makes cross-referencing straightforward and accurate.
+
+    The record dicts in raw are tagged in place rather than copied — both
+    callers hand over a fresh extract_duplicate_contacts() result.
     """
-    from collections import defaultdict
 
     raw_combined = raw.get("combined", [])
     raw_phone    = raw.get("phone", [])
@@ -75,9 +307,10 @@ def _build_strict_modes(raw: dict) -> dict:
 
     # Combined groups from process_dataframe are already correct
     # (grouped by phone+email both non-null)
-    combined = [
-        {**r, "match_type": "both"} for r in raw_combined
-    ]
+    combined = []
+    for r in raw_combined:
+        r["match_type"] = "both"
+        combined.append(r)
 
     # Track which phones and emails are already in combined
     combined_phones = {r["phone"] for r in raw_combined if r.get("phone")}
@@ -96,7 +329,8 @@ def _build_strict_modes(raw: dict) -> dict:
         if ph in combined_phones:
             # This phone is already captured in combined — skip
             continue
-        phone_only.append({**r, "match_type": "phone"})
+        r["match_type"] = "phone"
+        phone_only.append(r)
 
     # ── Email groups ──────────────────────────────────────────────────────
     # An email group is email-only if its email is NOT already in combined
@@ -107,7 +341,8 @@ def _build_strict_modes(raw: dict) -> dict:
         if em in combined_emails:
             # This email is already captured in combined — skip
             continue
-        email_only.append({**r, "match_type": "email"})
+        r["match_type"] = "email"
+        email_only.append(r)
 
     return {
         "combined": combined,
@@ -187,6 +422,7 @@ def debug_dataset(
 def duplicate_contact_view(
     request: Request,
     dataset_id: int,
+    background_tasks: BackgroundTasks,
     page: int = 1,
     search: str = "",
     mode: str = "combined",
@@ -225,40 +461,40 @@ def duplicate_contact_view(
 
     # ── Build duplicate cache ─────────────────────────────────────────────
     extract_error = None
-
-    if dataset_id not in DUPLICATE_CACHE:
-        if not os.path.exists(abs_path):
-            extract_error = (
-                f"File not found on disk.\n"
-                f"Path stored in DB: {dataset.file_path}\n"
-                f"Resolved to: {abs_path}\n"
-                f"Server working directory: {os.getcwd()}\n\n"
-                f"Fix: re-upload this file, or check your uploads directory."
-            )
-            DUPLICATE_CACHE[dataset_id] = {"combined": [], "phone": [], "email": []}
-        else:
-            # Prefer the header-corrected cleaned file if it exists.
-            # upload.py saves corrected headers as "cleaned_<stem>.csv"
-            # in the same directory — use that so phone/email columns are
-            # detected correctly after a header correction.
-            raw_dir      = os.path.dirname(abs_path)
-            raw_stem     = os.path.splitext(os.path.basename(abs_path))[0]
-            cleaned_path = os.path.join(raw_dir, f"cleaned_{raw_stem}.csv")
-            load_path    = cleaned_path if os.path.exists(cleaned_path) else abs_path
-            load_ext     = Path(load_path).suffix.lower().replace(".", "")
-
-            try:
-                raw = extract_duplicate_contacts(load_path, load_ext)
-                DUPLICATE_CACHE[dataset_id] = _build_strict_modes(raw)
-            except Exception as e:
-                extract_error = (
-                    f"{type(e).__name__}: {e}\n\n"
-                    f"File: {load_path}\n\n"
-                    f"{traceback.format_exc()}"
-                )
-                DUPLICATE_CACHE[dataset_id] = {"combined": [], "phone": [], "email": []}
-
-    all_results = DUPLICATE_CACHE.get(dataset_id, {})
+    processing    = False
+
+    load_path = _source_path(abs_path)
+    mtime     = _mtime(load_path)
+    cached    = DUPLICATE_CACHE.get(dataset_id)
+
+    if cached is not None and cached[0] == mtime:
+        _, all_results, extract_error = cached
+    elif not os.path.exists(abs_path):
+        extract_error = (
+            f"File not found on disk.\n"
+            f"Path stored in DB: {dataset.file_path}\n"
+            f"Resolved to: {abs_path}\n"
+            f"Server working directory: {os.getcwd()}\n\n"
+            f"Fix: re-upload this file, or check your uploads directory."
+        )
+        all_results = {"combined": [], "phone": [], "email": []}
+        DUPLICATE_CACHE[dataset_id] = (mtime, all_results, extract_error)
+    elif (persisted := _load_modes(dataset_id, mtime)) is not None:
+        all_results = persisted
+        DUPLICATE_CACHE[dataset_id] = (mtime, all_results, None)
+    elif (persisted_error := _load_error(dataset_id, mtime)) is not None:
+        extract_error = persisted_error
+        all_results   = {"combined": [], "phone": [], "email": []}
+        DUPLICATE_CACHE[dataset_id] = (mtime, all_results, extract_error)
+    else:
+        # Cold file: parse off the request and render a "processing" page
+        # that polls the status endpoint, instead of holding this worker
+        # for the whole extraction. The on-disk claim keeps other workers
+        # from starting a second extraction of the same file.
+        if _claim_extraction(dataset_id, mtime):
+            background_tasks.add_task(_extract_modes, dataset_id, load_path, abs_path, mtime)
+        processing  = True
+        all_results = {"combined": [], "phone": [], "email": []}
 
     if mode not in VALID_MODES:
         mode = "combined"
@@ -266,13 +502,21 @@ def duplicate_contact_view(
     results = all_results.get(mode, [])
 
     # ── Search ────────────────────────────────────────────────────────────
+    # Filtered lists are memoized so paging through a search result only
+    # slices; not while processing, when results are placeholders.
     if search:
         s = search.lower().strip()
-        results = [
-            r for r in results
-            if s in (r.get("phone", "") or "").lower()
-            or s in (r.get("email", "") or "").lower()
-        ]
+        search_key = (dataset_id, mtime, mode, s)
+        filtered = None if processing else SEARCH_CACHE.get(search_key)
+        if filtered is None:
+            filtered = [
+                r for r in results
+                if s in (r.get("phone", "") or "").lower()
+                or s in (r.get("email", "") or "").lower()
+            ]
+            if not processing:
+                SEARCH_CACHE[search_key] = filtered
+        results = filtered
 
     # ── Pagination ────────────────────────────────────────────────────────
     total       = len(results)
@@ -308,6 +552,7 @@ def duplicate_contact_view(
             "show_header":    True,
             "show_sidebar":  False,
             "extract_error":  extract_error,
+            "processing":     processing,
             "combined_count": len(all_results.get("combined", [])),
             "phone_count":    len(all_results.get("phone",    [])),
             "email_count":    len(all_results.get("email",    [])),
@@ -315,6 +560,48 @@ def duplicate_contact_view(
     )
 
 
+@router.get("/dataset/{dataset_id}/relations/status")
+def duplicate_contact_status(
+    dataset_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Polled by the relation page while extraction runs in the background."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+    effective_user = get_effective_user(request, db)
+    is_admin = user.get("role") == "admin"
+
+    query = db.query(Dataset.file_path).filter(Dataset.id == dataset_id)
+    if effective_user:
+        query = query.filter(Dataset.user_id == effective_user.id)
+    elif not is_admin:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+    row = query.first()
+    if row is None:
+        return JSONResponse({"error": "Dataset not found"}, status_code=404)
+
+    # Answered from the files every worker shares, not this process's
+    # memory: the poll may land on a worker that isn't running the job.
+    # With no result and no live claim, "ready" makes the page reload and
+    # start the extraction again.
+    mtime  = _mtime(_source_path(_resolve_path(row.file_path)))
+    cached = DUPLICATE_CACHE.get(dataset_id)
+    done = (
+        mtime is None
+        or (cached is not None and cached[0] == mtime)
+        or _modes_file(dataset_id, mtime).exists()
+        or _modes_file(dataset_id, mtime, ".err").exists()
+    )
+    if not done:
+        age  = _pending_age(dataset_id, mtime)
+        done = age is None or age > PENDING_STALE_SECONDS
+    return JSONResponse({"status": "ready" if done else "pending"})
+
+
 # ---------------------------------------------------------------------------
 # AJAX drill-down
 # ---------------------------------------------------------------------------
@@ -355,44 +642,39 @@ def get_duplicate_records(
     phone = None if phone in _empty else phone
     email = None if email in _empty else email
 
-    cache_key = f"{dataset_id}|{phone}|{email}"
-    if cache_key in LOOKUP_CACHE:
-        return LOOKUP_CACHE[cache_key]
+    abs_path  = _resolve_path(dataset.file_path)
+    load_path = _source_path(abs_path)
+    mtime     = _mtime(load_path)
 
-    abs_path = _resolve_path(dataset.file_path)
+    cache_key = (dataset_id, mtime, phone, email)
+    cached = LOOKUP_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
-    if dataset_id not in DATASET_CACHE:
+    cache_data = DATASET_CACHE.get(dataset_id)
+    if cache_data is None or cache_data["mtime"] != mtime:
+        # Another worker (or an earlier run) may already have built it
+        cache_data = _load_frame(dataset_id, mtime)
+        if cache_data is not None:
+            DATASET_CACHE[dataset_id] = cache_data
+
+    if cache_data is None:
         if not os.path.exists(abs_path):
             return {"error": f"File not found: {abs_path}"}
         try:
-            # Prefer the header-corrected cleaned file if available
-            raw_dir      = os.path.dirname(abs_path)
-            raw_stem     = os.path.splitext(os.path.basename(abs_path))[0]
-            cleaned_path = os.path.join(raw_dir, f"cleaned_{raw_stem}.csv")
-            load_path    = cleaned_path if os.path.exists(cleaned_path) else abs_path
-            df = shared.read_file(load_path)
+            df = _read_source(dataset_id, load_path, abs_path, mtime).copy(deep=False)
             df.columns = df.columns.str.lower().str.strip()
             df = df.fillna("")
 
             phone_cols = []
             email_col  = None
 
-            PHONE_KEYWORDS = [
-                "phone_no", "contact_no", "phone", "mobile", "cell",
-                "tel", "mob", "phoneno", "mobileno", "contactno",
-            ]
-            PHONE_EXCLUDES = [
-                "zip", "pin", "postal", "code", "index", "sr",
-                "ref", "two", "four", "wheeler", "company", "fax",
-            ]
-            EMAIL_KEYWORDS = ["email", "e-mail", "emailid", "emailaddress", "mail"]
-            EMAIL_EXCLUDES = ["name", "username", "filename"]
-
+            # Compiled keyword / exclude patterns shared with the view page
             for col in df.columns:
                 lc = col.lower()
-                if any(k in lc for k in PHONE_KEYWORDS) and not any(b in lc for b in PHONE_EXCLUDES):
+                if shared.is_phone_col(lc):
                     phone_cols.append(col)
-                if not email_col and any(k in lc for k in EMAIL_KEYWORDS) and not any(b in lc for b in EMAIL_EXCLUDES):
+                if not email_col and shared.is_email_col(lc):
                     email_col = col
 
             # Merge multiple phone columns
@@ -400,56 +682,71 @@ def get_duplicate_records(
             if len(phone_cols) == 1:
                 phone_col = phone_cols[0]
             elif len(phone_cols) > 1:
-                df["__merged_phone__"] = df[phone_cols].apply(
-                    lambda row: next(
-                        (
-                            str(v).strip().rstrip(".0")
-                            for v in row
-                            if pd.notna(v)
-                            and str(v).strip() not in ("", "nan", "none", "null", "0")
-                        ),
-                        None,
-                    ),
-                    axis=1,
-                )
+                df["__merged_phone__"] = shared.merge_phone_columns(df, phone_cols)
                 phone_col = "__merged_phone__"
 
             if phone_col:
-                df[phone_col] = df[phone_col].apply(normalize_phone_public)
+                df[phone_col] = normalize_phone_public_series(df[phone_col])
             if email_col:
-                df[email_col] = df[email_col].apply(normalize_email_public)
-
-            DATASET_CACHE[dataset_id] = {
-                "df": df, "phone_col": phone_col, "email_col": email_col,
+                df[email_col] = normalize_email_public_series(df[email_col])
+
+            # Cached as display strings; the phone/email filters below
+            # only ever compare against non-empty values, so "" for None
+            # doesn't change which rows match.
+            display = _display_frame(df)
+
+            # Key columns as categoricals: one int code per row instead of
+            # a str object, and == compares codes rather than strings.
+            for key_col in (phone_col, email_col):
+                if key_col:
+                    display[key_col] = display[key_col].astype("category")
+
+            # value -> row positions, so lookups are a dict hit instead of
+            # a full-column mask per request
+            def _positions(key_col):
+                if not key_col:
+                    return {}
+                return display.groupby(key_col, observed=True, sort=False).indices
+
+            cache_data = {
+                "mtime": mtime, "df": display,
+                "phone_col": phone_col, "email_col": email_col,
+                "phone_idx": _positions(phone_col), "email_idx": _positions(email_col),
             }
+            DATASET_CACHE[dataset_id] = cache_data
+            _save_frame(dataset_id, mtime, cache_data)
 
         except Exception as e:
             return {"error": str(e)}
 
-    cache_data = DATASET_CACHE[dataset_id]
     df         = cache_data["df"]
     phone_col  = cache_data["phone_col"]
     email_col  = cache_data["email_col"]
+    phone_idx  = cache_data["phone_idx"]
+    email_idx  = cache_data["email_idx"]
 
+    _none = np.empty(0, dtype=np.intp)
     match_type = "None"
 
     if phone and email and phone_col and email_col:
-        df2 = df[(df[phone_col] == phone) & (df[email_col] == email)]
+        rows = np.intersect1d(phone_idx.get(phone, _none), email_idx.get(email, _none))
         match_type = "Phone + Email"
     elif phone and phone_col and not email:
-        df2 = df[df[phone_col] == phone]
+        rows = phone_idx.get(phone, _none)
         match_type = "Phone only"
     elif email and email_col and not phone:
-        df2 = df[df[email_col] == email]
+        rows = email_idx.get(email, _none)
         match_type = "Email only"
     elif phone and phone_col:
-        df2 = df[df[phone_col] == phone]
+        rows = phone_idx.get(phone, _none)
         match_type = "Phone fallback"
     elif email and email_col:
-        df2 = df[df[email_col] == email]
+        rows = email_idx.get(email, _none)
         match_type = "Email fallback"
     else:
-        df2 = df.iloc[0:0]
+        rows = _none
+
+    df2 = df.take(rows)
 
     if df2.empty:
         result = {
@@ -459,10 +756,7 @@ def get_duplicate_records(
         LOOKUP_CACHE[cache_key] = result
         return result
 
-    records = [
-        {col: safe_val(row[col]) for col in df2.columns}
-        for _, row in df2.iterrows()
-    ]
+    records = df2.to_dict(orient="records")
 
     result = {
         "records":      records,
@@ -17,7 +17,9 @@ from sqlalchemy.orm import Session
 
 from auth import get_current_user
 from database import get_db
-from models import Dataset, Category, User
+from models import Dataset, Category, User, UserStats
+from utils.user_stats import refresh_user_stats
+from modules.relation import invalidate_dataset
 
 router = APIRouter(tags=["settings"])
 templates = Jinja2Templates(directory="templates")
@@ -127,8 +129,12 @@ def clear_datasets(
     if not user:
         return JSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
 
+    dataset_ids = [i for (i,) in db.query(Dataset.id).filter(Dataset.user_id == user["id"])]
     db.query(Dataset).filter(Dataset.user_id == user["id"]).delete(synchronize_session=False)
     db.commit()
+    refresh_user_stats(db, user["id"])
+    for dataset_id in dataset_ids:
+        invalidate_dataset(dataset_id)
     return JSONResponse({"success": True})
 
 
@@ -146,12 +152,16 @@ def delete_account(
         return JSONResponse({"success": False, "error": "Not authenticated"}, status_code=401)
 
     user_id = user["id"]
+    dataset_ids = [i for (i,) in db.query(Dataset.id).filter(Dataset.user_id == user_id)]
 
-    # Delete in dependency order: datasets → categories → user
+    # Delete in dependency order: stats / datasets → categories → user
+    db.query(UserStats).filter(UserStats.user_id == user_id).delete(synchronize_session=False)
     db.query(Dataset).filter(Dataset.user_id == user_id).delete(synchronize_session=False)
     db.query(Category).filter(Category.user_id == user_id).delete(synchronize_session=False)
     db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
     db.commit()
+    for dataset_id in dataset_ids:
+        invalidate_dataset(dataset_id)
 
     # Clear the session
     request.session.clear()
@@ -1,9 +1,31 @@
 # modules/shared.py
+import codecs
+import datetime
+import numpy as np
 import pandas as pd
 import re
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
 from pathlib import Path
 import os
 
+try:                       # optional — fastest CSV reader for large files
+    import polars as pl
+    _POLARS_OK = True
+except ImportError:
+    _POLARS_OK = False
+
+try:                       # optional — engine="pyarrow" CSV parsing
+    import pyarrow as pa
+    # Half the cores per process: large files are parsed in several worker
+    # processes at once, each with its own PyArrow thread pool
+    pa.set_cpu_count(max(1, (os.cpu_count() or 2) // 2))
+    _PYARROW_OK = True
+except ImportError:
+    _PYARROW_OK = False
+
 # ==================================================
 # DIRECTORIES
 # ==================================================
@@ -26,8 +48,59 @@ CLEAN_DIR.mkdir(exist_ok=True)
 # (DATASET_CACHE, _DATAFRAME_CACHE, _dataframe_cache) that did the same
 # job and caused silent cache misses.  One dict only.
 
-_DATAFRAME_CACHE: dict = {}
-DUPLICATE_CACHE:  dict = {}   # kept for relation.py compatibility
+class LRUCache:
+    """
+    Small thread-safe LRU mapping. Holds at most maxsize entries; reads
+    refresh an entry, inserts past the limit evict the least recently used.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __getitem__(self, key):
+        with self._lock:
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def discard_where(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+
+# Bounded: each entry is a whole DataFrame, so an unbounded dict grows
+# with every dataset ever opened.
+DATAFRAME_CACHE_MAX = 16
+
+_DATAFRAME_CACHE = LRUCache(DATAFRAME_CACHE_MAX)
 
 
 def get_cached_df(key: str):
@@ -40,27 +113,28 @@ def set_cached_df(key: str, df):
 
 # Legacy aliases so any existing callers still work
 def cache_dataframe(key, df):
-    _DATAFRAME_CACHE[key] = df
+    set_cached_df(key, df)
 
 
 def get_cached_dataframe(key):
-    return _DATAFRAME_CACHE.get(key)
+    return get_cached_df(key)
 
 
 def cache_dataframe_v2(key, df):
-    _DATAFRAME_CACHE[key] = df
+    set_cached_df(key, df)
 
 
 def get_cached_dataframe_v2(key):
-    if key in _DATAFRAME_CACHE:
-        return _DATAFRAME_CACHE[key]
+    df = get_cached_df(key)
+    if df is not None:
+        return df
 
     # Fall back to disk
     for base in (UPLOAD_DIR / key, UPLOAD_DIR / f"cleaned_{key}"):
         if base.exists():
             try:
                 df = read_file(str(base))
-                _DATAFRAME_CACHE[key] = df
+                set_cached_df(key, df)
                 return df
             except Exception:
                 pass
@@ -69,16 +143,59 @@ def get_cached_dataframe_v2(key):
 
 
 def get_cached_df_by_path(path: str):
-    if path in _DATAFRAME_CACHE:
-        return _DATAFRAME_CACHE[path]
+    """
+    Cached raw read of a CSV / Excel file.
+
+    Keyed on the file's mtime and size as well as the path, so a file
+    replaced under the same name is re-read; older versions are dropped.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    df = get_cached_df(key)
+    if df is not None:
+        return df
+    _DATAFRAME_CACHE.discard_where(
+        lambda k: isinstance(k, tuple) and k[0] == path and k[1:] != key[1:]
+    )
     try:
         df = pd.read_csv(path)
     except Exception:
         df = pd.read_excel(path)
-    _DATAFRAME_CACHE[path] = df
+    set_cached_df(key, df)
     return df
 
 
+def cache_by_file_version(maxsize: int):
+    """
+    Memoize a reader fn(path) on (absolute path, mtime, size), so a file
+    replaced under the same name is read again and older versions are
+    dropped. Hits return a shallow copy — with copy-on-write, callers that
+    rename or assign columns never touch the cached frame.
+    The wrapped function gets .cache_clear().
+    """
+    def decorator(fn):
+        cache = LRUCache(maxsize)
+
+        @wraps(fn)
+        def wrapper(file_path):
+            path = os.path.abspath(file_path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return fn(file_path)
+            key = (path, stat.st_mtime_ns, stat.st_size)
+            df = cache.get(key)
+            if df is None:
+                df = fn(file_path)
+                cache.discard_where(lambda k: k[0] == path)
+                cache[key] = df
+            return df.copy(deep=False)
+
+        wrapper.cache_clear = lambda: cache.discard_where(lambda k: True)
+        return wrapper
+    return decorator
+
+
 # ==================================================
 # HEADER DETECTION HELPERS
 # ==================================================
@@ -103,6 +220,31 @@ def get_cached_df_by_path(path: str):
 
 _FAKE_HEADER_THRESHOLD = 40   # percent of columns that must look bad
 
+# Compiled once — these run per column name and per phone value
+_DIGITS8_RE   = re.compile(r"\d{8,}")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# ASCII digits -> a non-ASCII marker, so a digit run becomes a plain
+# substring test (str.translate and "in" are both C-level)
+_DIGIT_MARK   = "\uffff"
+_DIGIT_TBL    = str.maketrans({d: _DIGIT_MARK for d in "0123456789"})
+_DIGIT_RUN_8  = _DIGIT_MARK * 8
+
+
+def _has_digit_run(text: str) -> bool:
+    """Same as _DIGITS8_RE.search(text); regex only for non-ASCII names."""
+    if text.isascii():
+        return _DIGIT_RUN_8 in text.translate(_DIGIT_TBL)
+    return _DIGITS8_RE.search(text) is not None
+
+
+def _is_pure_number(text: str) -> bool:
+    """Digits, optionally followed by "." and more digits ("1", "1.", "3.14")."""
+    if text.isdecimal():          # plain integers — the common numeric case
+        return True
+    head, _, tail = text.partition(".")
+    return head.isdecimal() and (not tail or tail.isdecimal())
+
 
 def _col_looks_like_data(col: str) -> bool:
     """
@@ -120,7 +262,7 @@ def _col_looks_like_data(col: str) -> bool:
         return True
 
     # 3. Contains 8 or more consecutive digits (phone / long account number)
-    if re.search(r"\d{8,}", col):
+    if _has_digit_run(col):
         return True
 
     # 4. Very long free-text (>60 chars — likely an address or description)
@@ -128,7 +270,7 @@ def _col_looks_like_data(col: str) -> bool:
         return True
 
     # 5. Pure number (e.g. "1", "42", "3.14")
-    if re.match(r"^\d+\.?\d*$", col):
+    if _is_pure_number(col):
         return True
 
     return False
@@ -143,10 +285,22 @@ def _is_fake_header(columns) -> bool:
     if total == 0:
         return False
 
-    bad = sum(1 for c in columns if _col_looks_like_data(str(c)))
-    bad_pct = (bad / total) * 100
+    # Stop as soon as the outcome is decided: enough bad names to reach the
+    # threshold, or enough good ones that it can no longer be reached
+    need_bad  = -(-total * _FAKE_HEADER_THRESHOLD // 100)   # ceil
+    max_good  = total - need_bad
+    bad = good = 0
+    for c in columns:
+        if _col_looks_like_data(str(c)):
+            bad += 1
+            if bad >= need_bad:
+                return True
+        else:
+            good += 1
+            if good > max_good:
+                return False
 
-    return bad_pct >= _FAKE_HEADER_THRESHOLD
+    return False
 
 
 def _analyze_first_rows(df: pd.DataFrame, num_rows: int = 3) -> bool:
@@ -177,6 +331,243 @@ def _analyze_first_rows(df: pd.DataFrame, num_rows: int = 3) -> bool:
 # MAIN FILE READER
 # ==================================================
 
+# UTF-8 CSVs above this size go through polars when it is installed
+POLARS_MIN_BYTES = 5 * 1024 * 1024
+
+
+def _c_parser_header(file_path: str, encoding: str) -> list:
+    """Column names exactly as the pandas C parser names them (repeats -> "name.1")."""
+    return list(pd.read_csv(file_path, nrows=0, encoding=encoding).columns)
+
+
+def _parsed_temporal_columns(df: pd.DataFrame) -> list:
+    """
+    Positions of columns the PyArrow reader turned into dates / times. The
+    C parser leaves those as text, and everything downstream (JSON records,
+    phone / email normalisation) expects the text.
+    """
+    found = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        if pd.api.types.is_datetime64_any_dtype(s) or pd.api.types.is_timedelta64_dtype(s):
+            found.append(i)
+        elif s.dtype == object:
+            first = s.first_valid_index()
+            if first is not None and isinstance(s.at[first], (datetime.date, datetime.time)):
+                found.append(i)
+    return found
+
+
+def _read_csv_pyarrow(file_path: str, encoding: str, header) -> pd.DataFrame:
+    """
+    engine="pyarrow" parse made to match the C parser's output: date-like
+    columns are re-read as text, and repeated header names get the C
+    parser's "name.1" suffixes. Raises when it can't match, so the caller
+    falls back to the C parser.
+    """
+    df = pd.read_csv(file_path, engine="pyarrow", encoding=encoding, header=header)
+
+    temporal = _parsed_temporal_columns(df)
+    if temporal:
+        names = list(df.columns)
+        if len(set(names)) != len(names):
+            raise ValueError("repeated header names with date columns")
+        df = pd.read_csv(
+            file_path, engine="pyarrow", encoding=encoding, header=header,
+            dtype={names[i]: str for i in temporal},
+        )
+        if _parsed_temporal_columns(df):
+            raise ValueError("date columns still parsed")
+    return df
+
+
+def _read_csv_fast(file_path: str, encoding: str = "utf-8", header="infer") -> pd.DataFrame:
+    """
+    Parse a CSV with polars (large UTF-8 files, if installed) or the
+    multithreaded PyArrow reader, falling back to the pandas C tokenizer
+    when neither is available or accepts the file. Errors from the C parse
+    (e.g. UnicodeDecodeError) propagate as before.
+
+    Either fast reader's result is brought in line with the C parser: date
+    columns stay text and repeated header names are renamed "name.1",
+    "name.2" (neither reader does that, and a repeated name makes df[col]
+    a DataFrame).
+    """
+    df = None
+    if _POLARS_OK and encoding.startswith("utf-8") and os.path.getsize(file_path) > POLARS_MIN_BYTES:
+        try:
+            # No ignore_errors: a type clash past the inference window must
+            # fall through to pandas rather than silently become null
+            df = pl.read_csv(
+                file_path, infer_schema_length=10_000, has_header=header is not None,
+            ).to_pandas()
+            if _parsed_temporal_columns(df):
+                df = None
+        except Exception:
+            df = None
+    if df is None:
+        try:
+            df = _read_csv_pyarrow(file_path, encoding, header)
+        except Exception:
+            df = None
+
+    if df is not None and header is not None:
+        try:
+            names = _c_parser_header(file_path, encoding)
+        except Exception:
+            names = None
+        if names is not None and len(names) == df.shape[1]:
+            df.columns = names
+        else:
+            df = None
+
+    if df is None:
+        df = pd.read_csv(file_path, encoding=encoding, header=header, low_memory=False)
+    return df
+
+
+# Rows parsed up front to decide whether a CSV's first row is a real header
+HEADER_PEEK_ROWS = 50
+
+# Bytes sampled to pick a CSV's encoding before parsing
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+
+def _detect_encoding(file_path: str) -> str:
+    """
+    "utf-8-sig" for a UTF-8 BOM, "utf-8" if the first ENCODING_SAMPLE_BYTES
+    decode cleanly, else "latin1" — chosen up front instead of letting a
+    failed UTF-8 parse raise first.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(ENCODING_SAMPLE_BYTES)
+    except OSError:
+        return "utf-8"
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: a multi-byte character cut off by the sample is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin1"
+
+
+def _clean_column_names(columns) -> list:
+    return [
+        str(col).strip().replace("\n", " ").replace("\t", " ")
+        for col in columns
+    ]
+
+
+def _peek_fake_header(file_path: str, encoding: str) -> bool:
+    """
+    Decide from the first HEADER_PEEK_ROWS rows whether a CSV's header row
+    is really data, so the full parse can use header=None in one pass.
+    False when the peek itself fails — read_file's checks then run on the
+    full parse as usual.
+    """
+    try:
+        peek = pd.read_csv(file_path, nrows=HEADER_PEEK_ROWS, encoding=encoding)
+    except Exception:
+        return False
+
+    peek.columns = _clean_column_names(peek.columns)
+    return _is_fake_header(peek.columns) or _analyze_first_rows(peek)
+
+
+EXCEL_ENGINES = ("calamine", "openpyxl", "xlrd")
+
+# Engines that can actually open each sniffed format — xlrd >= 2 only reads
+# .xls and openpyxl only .xlsx, so trying the other one is a guaranteed failure
+_EXCEL_ENGINES_FOR = {
+    "xlsx": ("calamine", "openpyxl"),
+    "xls":  ("calamine", "xlrd"),
+}
+
+XLSX_MAGIC = b"PK\x03\x04"                          # zip container
+XLS_MAGIC  = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"  # OLE2 compound file
+PARQUET_MAGIC = b"PAR1"                             # cleaned copies (save_cleaned)
+
+
+def _sniff(file_path: str):
+    """
+    File kind from its first bytes: "xlsx", "xls", "parquet" or "csv"
+    (anything else is treated as text). None if the file can't be read.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(8)
+    except OSError:
+        return None
+    if head.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(XLS_MAGIC):
+        return "xls"
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    return "csv"
+
+
+def _read_excel(file_path: str, engines, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_excel with the first engine that works. calamine (Rust,
+    streaming) goes first wherever it's listed; openpyxl / xlrd build the
+    whole workbook in Python and are only the fallback.
+    """
+    error = None
+    for engine in engines:
+        try:
+            return pd.read_excel(file_path, engine=engine, **kwargs)
+        except Exception as e:
+            error = e
+    raise error
+
+
+_MANGLED_DUP_RE = re.compile(r"^(.*)\.\d+$")   # pandas' "name.1" for a repeated header
+
+
+def _header_as_first_row(df: pd.DataFrame, raw_columns: list):
+    """
+    Push the parsed header row back down as data row 0 — what re-reading
+    with header=None returns, without parsing the file a second time.
+
+    Returns None when the first parse already lost information (blank or
+    repeated names were renamed) or a header value doesn't fit its column's
+    dtype (e.g. text above a numeric column); the caller re-reads then.
+    """
+    names = {str(c) for c in raw_columns}
+    row   = {}
+    for i, raw in enumerate(raw_columns):
+        s    = df.iloc[:, i]
+        text = str(raw)
+        if not text.strip() or text.startswith("Unnamed:"):
+            return None
+        m = _MANGLED_DUP_RE.match(text)
+        if m and m.group(1) in names:
+            return None
+
+        if pd.api.types.is_bool_dtype(s):
+            return None
+        if pd.api.types.is_numeric_dtype(s):
+            value = pd.to_numeric(text, errors="coerce") if isinstance(raw, str) else raw
+            if pd.isna(value):
+                return None
+            row[i] = pd.Series([value])
+        elif pd.api.types.is_string_dtype(s) or s.dtype == object:
+            row[i] = pd.Series([raw], dtype=s.dtype if isinstance(raw, str) else object)
+        else:
+            return None
+
+    body = df.set_axis(range(len(raw_columns)), axis=1)
+    return pd.concat([pd.DataFrame(row), body], ignore_index=True)
+
+
+READ_FILE_CACHE_MAX = 8
+
+
+@cache_by_file_version(READ_FILE_CACHE_MAX)
 def read_file(file_path: str) -> pd.DataFrame:
     """
     Universal file reader.
@@ -192,61 +583,63 @@ def read_file(file_path: str) -> pd.DataFrame:
       • The correction page to show meaningless column names
       • All subsequent duplicate detection to fail
 
-    The fix: choose the PRIMARY engine based on file extension first.
-    Only fall back to other engines if the primary engine raises an exception.
+    The fix: choose the PRIMARY engine from the file's magic bytes (the
+    extension only if they can't be read). Only fall back to other engines
+    if the primary engine raises an exception.
     """
     file_path = str(file_path)
-    ext = os.path.splitext(file_path)[1].lower()
+    ext  = os.path.splitext(file_path)[1].lower()
+    kind = _sniff(file_path) or (ext.lstrip(".") if ext in (".xlsx", ".xls") else "csv")
+
+    # Our own cleaned copies: real header, dtypes stored — nothing to fix up
+    if kind == "parquet":
+        return pd.read_parquet(file_path)
 
     df = None
+    headerless = False   # True once df was parsed with header=None
 
-    # ── Extension-first engine selection ──────────────────────────────────
-    if ext in (".xlsx", ".xls"):
-        # Primary: correct Excel engine
-        engine = "openpyxl" if ext == ".xlsx" else "xlrd"
+    # ── Content-first engine selection ────────────────────────────────────
+    if kind in ("xlsx", "xls"):
+        # Primary: Rust-backed calamine reads both formats, then the
+        # pure-Python engine for this format
         try:
-            df = pd.read_excel(file_path, engine=engine)
+            df = _read_excel(file_path, _EXCEL_ENGINES_FOR[kind])
         except Exception:
             pass
 
-        # Fallback: try the other Excel engine
-        if df is None:
-            fallback = "xlrd" if engine == "openpyxl" else "openpyxl"
-            try:
-                df = pd.read_excel(file_path, engine=fallback)
-            except Exception:
-                pass
-
         # Last resort: maybe it's actually a CSV with wrong extension
         if df is None:
             try:
-                df = pd.read_csv(file_path, encoding="utf-8", low_memory=False)
+                df = _read_csv_fast(file_path, "utf-8")
             except Exception:
                 try:
-                    df = pd.read_csv(file_path, encoding="latin1", low_memory=False)
+                    df = _read_csv_fast(file_path, "latin1")
                 except Exception:
                     pass
 
     else:
-        # Primary: CSV (for .csv, .txt, and unknown extensions)
+        # Primary: CSV (for .csv, .txt, and unknown extensions). The header
+        # decision is made on a small peek so a fake header costs no re-read.
+        encoding = _detect_encoding(file_path)
+        header   = None if _peek_fake_header(file_path, encoding) else "infer"
         try:
-            df = pd.read_csv(file_path, encoding="utf-8", low_memory=False)
+            df = _read_csv_fast(file_path, encoding, header)
         except UnicodeDecodeError:
+            # Invalid UTF-8 beyond the sampled bytes
             try:
-                df = pd.read_csv(file_path, encoding="latin1", low_memory=False)
+                df = _read_csv_fast(file_path, "latin1", header)
             except Exception:
                 pass
         except Exception:
             pass
+        headerless = df is not None and header is None
 
         # Fallback: maybe it's actually an Excel file with wrong extension
         if df is None:
-            for engine in ("openpyxl", "xlrd"):
-                try:
-                    df = pd.read_excel(file_path, engine=engine)
-                    break
-                except Exception:
-                    pass
+            try:
+                df = _read_excel(file_path, EXCEL_ENGINES)
+            except Exception:
+                pass
 
         # Final fallback
         if df is None:
@@ -261,27 +654,32 @@ def read_file(file_path: str) -> pd.DataFrame:
         raise Exception(f"Unsupported or corrupt file: {os.path.basename(file_path)}")
 
     # ── Clean raw column names ─────────────────────────────────────────────
-    df.columns = [
-        str(col).strip().replace("\n", " ").replace("\t", " ")
-        for col in df.columns
-    ]
+    raw_columns = list(df.columns)
+    df.columns = _clean_column_names(df.columns)
 
     # ── Detect and fix fake headers ────────────────────────────────────────
-    primary_check = _is_fake_header(df.columns)
+    primary_check = False
     backup_check  = False
 
-    if not primary_check:
-        backup_check = _analyze_first_rows(df)
+    if headerless:
+        df.columns = [f"Column_{i + 1}" for i in range(len(df.columns))]
+    else:
+        primary_check = _is_fake_header(df.columns)
+        if not primary_check:
+            backup_check = _analyze_first_rows(df)
 
     if primary_check or backup_check:
+        reparsed = _header_as_first_row(df, raw_columns)
         try:
-            if ext == ".csv":
+            if reparsed is not None:
+                df = reparsed
+            elif kind == "csv":
                 df = pd.read_csv(
                     file_path, header=None,
                     encoding="utf-8", encoding_errors="ignore",
                 )
             else:
-                df = pd.read_excel(file_path, header=None)
+                df = _read_excel(file_path, _EXCEL_ENGINES_FOR.get(kind, EXCEL_ENGINES), header=None)
         except Exception as e:
             raise Exception(f"Re-read without header failed: {e}")
 
@@ -301,6 +699,177 @@ def read_file(file_path: str) -> pd.DataFrame:
     return df
 
 
+# Plain CSVs at least this big are parsed column-subset-only, chunk by
+# chunk, by callers that need just a few columns (read_csv_columns)
+CHUNKED_READ_MIN_BYTES = 256 * 1024 * 1024
+CSV_CHUNK_ROWS = 500_000
+
+
+def read_csv_columns(file_path: str, select, chunksize: int = CSV_CHUNK_ROWS):
+    """
+    Parse only the columns of a plain-text CSV whose header name (cleaned as
+    read_file cleans it) passes select(name), chunksize rows at a time, so
+    a wide multi-GB file never exists in memory at full width.
+
+    Returns None when read_file's handling is needed instead: not a plain
+    CSV, a header that looks like data, or a parse error.
+    """
+    if _sniff(file_path) != "csv":
+        return None
+    encoding = _detect_encoding(file_path)
+    if _peek_fake_header(file_path, encoding):
+        return None
+
+    for enc in (encoding, "latin1"):
+        try:
+            header = pd.read_csv(file_path, nrows=0, encoding=enc).columns
+            names  = _clean_column_names(header)
+            if _is_fake_header(names):
+                return None
+            names = [
+                f"Column_{i + 1}"
+                if (c.lower().startswith("unnamed") or c in ("", "nan"))
+                else c
+                for i, c in enumerate(names)
+            ]
+            keep = [i for i, c in enumerate(names) if select(c)]
+            if not keep:
+                return pd.DataFrame(index=pd.RangeIndex(0))
+
+            chunks = pd.read_csv(
+                file_path, encoding=enc, usecols=keep, chunksize=chunksize,
+            )
+            df = pd.concat(chunks, ignore_index=True)
+            df.columns = [names[i] for i in keep]
+            return df
+        except UnicodeDecodeError:
+            continue          # invalid UTF-8 past the sampled bytes
+        except Exception:
+            return None
+    return None
+
+
+# ==================================================
+# CLEANED COPIES
+# ==================================================
+# Upload saves the duplicate-marked / header-corrected frame next to the
+# raw file as cleaned_<stem>; the view and relation pages load it instead.
+# Parquet keeps dtypes and skips the text parse on reload. "csv" restores
+# the old text format.
+#
+# When the marked frame is just the raw file run through detect_duplicates
+# (no column mapping), only the columns detect_duplicates produced — the
+# __dup_* flags and the normalized phone / email — are stored, as
+# cleaned_<stem>.dup.parquet; read_cleaned() lays them back over the raw
+# file instead of keeping a second full copy on disk.
+
+CLEANED_FORMAT = "parquet"
+CLEANED_SIDECAR_SUFFIX = ".dup.parquet"
+_CLEANED_SUFFIXES = (".parquet", CLEANED_SIDECAR_SUFFIX, ".csv")
+
+
+def _cleaned_base(raw_path: str) -> str:
+    return os.path.join(os.path.dirname(raw_path), f"cleaned_{Path(raw_path).stem}")
+
+
+def cleaned_path_for(raw_path: str):
+    """
+    Path of the cleaned copy saved for raw_path — cleaned_<stem>.parquet,
+    the .dup.parquet sidecar, or cleaned_<stem>.csv from older uploads.
+    None if there is none. Load it with read_cleaned().
+    """
+    base = _cleaned_base(raw_path)
+    for suffix in _CLEANED_SUFFIXES:
+        if os.path.exists(base + suffix):
+            return base + suffix
+    return None
+
+
+def _sidecar_columns(df_marked: pd.DataFrame) -> list:
+    """Columns detect_duplicates wrote: normalized phone / email + __dup_* flags."""
+    flags  = [c for c in df_marked.columns if str(c).startswith("__dup_")]
+    data   = [c for c in df_marked.columns if c not in flags]
+    phones = [c for c in data if is_phone_col(c)]
+    emails = [c for c in data if is_email_col(c)]
+    # Several phone columns are merged into a local Series, not written back
+    written = phones if len(phones) == 1 else []
+    return written + emails[:1] + flags
+
+
+def save_cleaned(df: pd.DataFrame, raw_path: str, sidecar: bool = False) -> str:
+    """
+    Write df as the cleaned copy of raw_path and return its path.
+    sidecar=True: df is detect_duplicates(read_file(raw_path)), so only the
+    columns it produced are stored (Parquet only).
+    Falls back to CSV when Parquet can't be written (pyarrow missing,
+    mixed-type object columns, repeated column names). Each call writes its
+    own temp file and renames it into place, so concurrent writers of the
+    same dataset don't clobber each other and readers never see a partial
+    file.
+    """
+    base = _cleaned_base(raw_path)
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(base) or ".",
+        prefix=os.path.basename(base) + ".",
+        suffix=".tmp",
+    )
+    os.close(fd)
+    path = None
+    try:
+        if CLEANED_FORMAT == "parquet":
+            try:
+                if sidecar:
+                    df[_sidecar_columns(df)].to_parquet(tmp, compression="zstd", index=False)
+                    path = base + CLEANED_SIDECAR_SUFFIX
+                else:
+                    df.to_parquet(tmp, compression="zstd", index=False)
+                    path = base + ".parquet"
+            except Exception:
+                pass
+        if path is None:
+            df.to_csv(tmp, index=False)
+            path = base + ".csv"
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    # Don't leave an older copy in another format behind
+    for suffix in _CLEANED_SUFFIXES:
+        if base + suffix != path:
+            try:
+                os.remove(base + suffix)
+            except FileNotFoundError:
+                pass
+    return path
+
+
+def read_cleaned(load_path: str, raw_path: str) -> pd.DataFrame:
+    """
+    read_file() for a path from cleaned_path_for(). A sidecar is laid over
+    the raw file: same lowercased headers, normalized phone / email and
+    __dup_* flags as the detect_duplicates() frame it was saved from.
+    A sidecar that no longer lines up with the raw file yields the raw
+    frame unmarked (callers re-mark it).
+    """
+    if not load_path.endswith(CLEANED_SIDECAR_SUFFIX):
+        return read_file(load_path)
+
+    df    = read_file(raw_path)
+    marks = pd.read_parquet(load_path)
+    if len(marks) != len(df):
+        return df
+
+    df = df.copy(deep=False)
+    df.columns = df.columns.str.lower().str.strip()
+    for col in marks.columns:
+        df[col] = marks[col].set_axis(df.index)
+    return df
+
+
 # ==================================================
 # COLUMN ANALYSIS
 # ==================================================
@@ -316,42 +885,49 @@ def check_required_columns(df: pd.DataFrame):
         "problematic_headers": [],
     }
     detected = {}
-    generated_columns = []
-
-    for col in df.columns:
-        col_str = str(col).strip().lower()
-
-        # Auto-generated sentinel
-        if re.match(r"^column_\d+$", col_str):
-            generated_columns.append(col)
-            continue
-
-        # Structural header problems
-        if not col_str or col_str == "nan":
-            info["has_header_problem"] = True
-            info["problem_reason"] = "null_header"
-            info["problematic_headers"].append(col)
-            continue
-
-        if "@" in col_str:
-            info["has_header_problem"] = True
-            info["problem_reason"] = "email_in_header"
-            info["problematic_headers"].append(col)
-            continue
-
-        if re.search(r"\d{8,}", col_str):
-            info["has_header_problem"] = True
-            info["problem_reason"] = "phone_in_header"
-            info["problematic_headers"].append(col)
-            continue
-
-        # Column mapping detection
-        if "name" in col_str and "file" not in col_str:
-            detected["name"] = col
-        if "mail" in col_str or "email" in col_str:
-            detected["email"] = col
-        if any(k in col_str for k in ("phone", "mobile", "contact")):
-            detected["phone"] = col
+
+    # One vectorized pass per rule over the names; each rule only applies to
+    # names no earlier rule claimed (generated > null > email > phone).
+    names = pd.Index([str(c) for c in df.columns], dtype=object).str.strip().str.lower()
+    cols  = np.asarray(df.columns, dtype=object)
+
+    generated = np.asarray(names.str.fullmatch(r"column_\d+"), dtype=bool)
+    null_hdr  = ~generated & np.asarray((names == "") | (names == "nan"), dtype=bool)
+    open_     = ~generated & ~null_hdr
+    email_hdr = open_ & np.asarray(names.str.contains("@", regex=False), dtype=bool)
+    open_    &= ~email_hdr
+    phone_hdr = open_ & np.asarray(names.str.contains(_DIGITS8_RE), dtype=bool)
+    normal    = open_ & ~phone_hdr
+
+    problem = null_hdr | email_hdr | phone_hdr
+    if problem.any():
+        last = np.flatnonzero(problem)[-1]
+        info["has_header_problem"] = True
+        info["problem_reason"] = (
+            "null_header" if null_hdr[last] else
+            "email_in_header" if email_hdr[last] else
+            "phone_in_header"
+        )
+        info["problematic_headers"] = cols[problem].tolist()
+
+    # Column mapping detection — the last matching column wins and keys keep
+    # the order they were first seen in, as with the old per-column loop
+    def has(pattern):
+        return np.asarray(names.str.contains(pattern), dtype=bool)
+
+    matches = []
+    for key, mask in (
+        ("name",  normal & has("name") & ~has("file")),
+        ("email", normal & has("mail")),
+        ("phone", normal & has("phone|mobile|contact")),
+    ):
+        hits = np.flatnonzero(mask)
+        if len(hits):
+            matches.append((hits[0], key, cols[hits[-1]]))
+    for _, key, col in sorted(matches, key=lambda m: m[0]):
+        detected[key] = col
+
+    generated_columns = cols[generated].tolist()
 
     if generated_columns:
         info["has_header_problem"] = True
@@ -365,7 +941,8 @@ def check_required_columns(df: pd.DataFrame):
 def analyze_file_columns(df: pd.DataFrame):
     """Prepare data for the column-correction page."""
     columns = list(df.columns)
-    preview = {col: df[col].astype(str).head(10).tolist() for col in columns}
+    head    = df.head(10)   # stringify only the rows shown, not whole columns
+    preview = {col: head[col].astype(str).tolist() for col in columns}
     _, detected, _ = check_required_columns(df)
 
     return {
@@ -410,7 +987,7 @@ def normalize_phone(phone) -> str:
     if phone.endswith(".0"):
         phone = phone[:-2]
 
-    phone = re.sub(r"\D", "", phone)
+    phone = _NON_DIGIT_RE.sub("", phone)
 
     # Strip Indian country code
     if phone.startswith("91") and len(phone) > 10:
@@ -423,16 +1000,45 @@ def normalize_phone(phone) -> str:
     return None
 
 
+EMAIL_EMPTY_VALUES = frozenset({'', 'nan', 'none', 'null', 'n/a', 'na', '-', 'nil'})
+
+
 def normalize_email(email: str) -> str:
     """Clean and lowercase an email address."""
     if not email:
         return None
     val = str(email).strip().lower()
 
-    EMPTY_VALUES = {'', 'nan', 'none', 'null', 'n/a', 'na', '-', 'nil'}
-    if val in EMPTY_VALUES:
+    if val in EMAIL_EMPTY_VALUES:
       return None          # ✅ catches "nan" strings from pandas
     return val
+
+
+_EXCEL_FLOAT_RE = re.compile(r"\.0$")
+_CC91_RE        = re.compile(r"^91(?=\d{9})")   # 91 + >8 digits
+
+
+def normalize_phone_series(s: pd.Series) -> pd.Series:
+    """
+    Column-wide normalize_phone() using pandas .str ops instead of a Python
+    call per row. Same rules: drop a trailing Excel ".0", keep digits, strip
+    a leading 91 country code, accept 7–12 digits, else None.
+    """
+    digits = (
+        s.astype(str).str.strip()
+        .str.replace(_EXCEL_FLOAT_RE, "", regex=True)
+        .str.replace(_NON_DIGIT_RE, "", regex=True)
+        .str.replace(_CC91_RE, "", regex=True)
+    )
+    valid = digits.str.len().between(7, 12)
+    return digits.astype(object).where(valid, None)
+
+
+def normalize_email_series(s: pd.Series) -> pd.Series:
+    """Column-wide normalize_email() using pandas .str ops."""
+    val = s.astype(str).str.strip().str.lower()
+    empty = s.isna() | s.isin(["", 0]) | val.isin(EMAIL_EMPTY_VALUES)
+    return val.astype(object).where(~empty, None)
   
 # ==================================================
 # DUPLICATE DETECTION  (upload-time marking)
@@ -455,46 +1061,88 @@ PHONE_EXCLUDES = [
 EMAIL_KEYWORDS = ["email", "e-mail", "emailid", "emailaddress", "mail"]
 EMAIL_EXCLUDES = ["name", "username", "filename"]
 
+# Same lists as single compiled alternations — one C-level scan per column
+# name instead of a Python any() loop per keyword.
+def _alternation(words):
+    return re.compile("|".join(map(re.escape, words)))
+
+PHONE_RE         = _alternation(PHONE_KEYWORDS)
+PHONE_EXCLUDE_RE = _alternation(PHONE_EXCLUDES)
+EMAIL_RE         = _alternation(EMAIL_KEYWORDS)
+EMAIL_EXCLUDE_RE = _alternation(EMAIL_EXCLUDES)
+
+
+def is_phone_col(name: str) -> bool:
+    """Lowercase column name looks like a phone column."""
+    return bool(PHONE_RE.search(name)) and not PHONE_EXCLUDE_RE.search(name)
+
+
+def is_email_col(name: str) -> bool:
+    """Lowercase column name looks like an email column."""
+    return bool(EMAIL_RE.search(name)) and not EMAIL_EXCLUDE_RE.search(name)
+
+
+# Looser first-match scan used by the exports; upload stores its result on
+# Dataset.phone_col / email_col so exports don't have to rescan headers.
+CONTACT_PHONE_RE = re.compile("|".join(["phone", "mobile", "contact", "tel", "cell"]))
+CONTACT_EMAIL_RE = re.compile("|".join(["email", "mail", "e-mail"]))
+
+
+def detect_contact_cols(columns) -> tuple:
+    """First phone-like and first email-like column name (or None)."""
+    phone_col = None
+    email_col = None
+
+    for col in columns:
+        col_lower = str(col).lower().strip()
+        if not phone_col and CONTACT_PHONE_RE.search(col_lower):
+            phone_col = col
+        if not email_col and CONTACT_EMAIL_RE.search(col_lower):
+            email_col = col
+
+    return phone_col, email_col
+
+
+_PHONE_MERGE_EMPTY = ("", "nan", "none", "null", "0")
+
+
+def merge_phone_columns(df: pd.DataFrame, phone_cols: list) -> pd.Series:
+    """
+    First usable value per row across phone_cols (left to right), stripped
+    and with trailing ".0" characters removed; None where no column has one.
+    Column-wise replacement for the row-wise apply(axis=1) merge.
+    """
+    merged = pd.Series(None, index=df.index, dtype=object)
+    for col in phone_cols:
+        s = df[col]
+        text = s.astype(str).str.strip()
+        usable = s.notna() & ~text.isin(_PHONE_MERGE_EMPTY)
+        candidate = text.str.rstrip(".0").astype(object).where(usable)
+        merged = merged.where(merged.notna(), candidate)
+    return merged.where(merged.notna(), None)
+
 
 def _detect_phone_email_cols(df: pd.DataFrame):
     """
-    Shared helper — returns (phone_col, email_col) after:
+    Shared helper — returns (phone, email_col) after:
       1. Strict keyword matching with exclude list
       2. Merging multiple phone columns (contact_no + phone_no) into one
+    phone is the phone column's name, or — when there are several — a
+    Series holding the merged values; df itself is never modified.
     df must already have lowercase stripped column names.
     """
-    phone_cols = [
-        c for c in df.columns
-        if any(k in c for k in PHONE_KEYWORDS)
-        and not any(b in c for b in PHONE_EXCLUDES)
-    ]
-    email_cols = [
-        c for c in df.columns
-        if any(k in c for k in EMAIL_KEYWORDS)
-        and not any(b in c for b in EMAIL_EXCLUDES)
-    ]
+    phone_cols = [c for c in df.columns if is_phone_col(c)]
+    email_cols = [c for c in df.columns if is_email_col(c)]
 
     # Merge multiple phone columns — first non-null value per row wins
-    phone_col = None
+    phone = None
     if len(phone_cols) == 1:
-        phone_col = phone_cols[0]
+        phone = phone_cols[0]
     elif len(phone_cols) > 1:
-        df["__merged_phone__"] = df[phone_cols].apply(
-            lambda row: next(
-                (
-                    str(v).strip().rstrip(".0")
-                    for v in row
-                    if pd.notna(v)
-                    and str(v).strip() not in ("", "nan", "none", "null", "0")
-                ),
-                None,
-            ),
-            axis=1,
-        )
-        phone_col = "__merged_phone__"
+        phone = merge_phone_columns(df, phone_cols)
 
     email_col = email_cols[0] if email_cols else None
-    return phone_col, email_col
+    return phone, email_col
 
 
 def detect_duplicates(df: pd.DataFrame) -> pd.DataFrame:
@@ -511,48 +1159,72 @@ def detect_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     Uses same column detection as duplicate_detector.py so view page
     and relation page always show the same counts.
     """
-    df = df.copy()
+    # Shallow copy: under copy-on-write the columns added / replaced below
+    # never reach the caller's frame, and untouched columns aren't duplicated
+    df = df.copy(deep=False)
     df.columns = df.columns.str.lower().str.strip()
 
-    phone_col, email_col = _detect_phone_email_cols(df)
+    phone_src, email_col = _detect_phone_email_cols(df)
 
-    if phone_col:
-        df[phone_col] = df[phone_col].apply(normalize_phone)
+    # A real phone column is normalized in place; merged phones stay a
+    # local Series rather than becoming an extra column in the output
+    phone_vals = None
+    if isinstance(phone_src, pd.Series):
+        phone_vals = normalize_phone_series(phone_src)
+    elif phone_src:
+        df[phone_src] = normalize_phone_series(df[phone_src])
+        phone_vals = df[phone_src]
+
+    email_vals = None
     if email_col:
-        df[email_col] = df[email_col].apply(normalize_email)
+        df[email_col] = normalize_email_series(df[email_col])
+        email_vals = df[email_col]
+
+    no_dups  = pd.Series(False, index=df.index)
+    combined = no_dups
+    phone    = no_dups
+    email    = no_dups
 
-    df["__dup_combined__"] = False
-    df["__dup_phone__"]    = False
-    df["__dup_email__"]    = False
+    # Factorize once: duplicated() then hashes int codes, not strings.
+    # Missing values get code -1; the has_* masks exclude them anyway.
+    def _dups(codes) -> pd.Series:
+        return pd.Series(codes, index=df.index).duplicated(keep=False)
+
+    phone_codes = pd.factorize(phone_vals)[0] if phone_vals is not None else None
+    email_codes = pd.factorize(email_vals)[0] if email_vals is not None else None
 
     # Combined — both fields must have real non-empty values
-    if phone_col and email_col:
+    if phone_vals is not None and email_vals is not None:
         has_both = (
-            df[phone_col].notna() & (df[phone_col] != "") &
-            df[email_col].notna() & (df[email_col] != "")
-        )
-        df["__dup_combined__"] = (
-            df.duplicated(subset=[phone_col, email_col], keep=False) & has_both
+            phone_vals.notna() & (phone_vals != "") &
+            email_vals.notna() & (email_vals != "")
         )
+        # (phone, email) pair as one int64 code
+        pair_codes = phone_codes.astype("int64") * (int(email_codes.max(initial=0)) + 2) + email_codes
+        combined = _dups(pair_codes) & has_both
 
     # Phone only — must have real phone value AND not already combined
-    if phone_col:
-        has_phone = df[phone_col].notna() & (df[phone_col] != "")
-        df["__dup_phone__"] = (
-            df.duplicated(subset=[phone_col], keep=False)
+    if phone_vals is not None:
+        has_phone = phone_vals.notna() & (phone_vals != "")
+        phone = (
+            _dups(phone_codes)
             & has_phone
-            & ~df["__dup_combined__"]
+            & ~combined
         )
 
     # Email only — must have real email value AND not already combined
-    if email_col:
-        has_email = df[email_col].notna() & (df[email_col] != "")
-        df["__dup_email__"] = (
-            df.duplicated(subset=[email_col], keep=False)
+    if email_vals is not None:
+        has_email = email_vals.notna() & (email_vals != "")
+        email = (
+            _dups(email_codes)
             & has_email
-            & ~df["__dup_combined__"]
+            & ~combined
         )
 
+    df["__dup_combined__"] = combined
+    df["__dup_phone__"]    = phone
+    df["__dup_email__"]    = email
+
     return df
 
 
@@ -566,34 +1238,52 @@ def detect_exact_duplicates(df: pd.DataFrame) -> dict:
       duplicate_indices — set of row indices that are exact duplicates
     """
     internal_cols = [c for c in df.columns if c.startswith("__")]
-    df_clean = df.drop(columns=internal_cols, errors="ignore").copy()
+    df_clean = df.drop(columns=internal_cols, errors="ignore")
 
-    # Normalize: lowercase + strip, NaN → ""
-    df_norm = df_clean.apply(
-        lambda col: col.map(
-            lambda v: str(v).strip().lower() if pd.notna(v) else ""
-        )
+    # Normalize text: lowercase + strip, NaN → "" (column-wise .str ops).
+    # Numeric / bool / datetime columns are hashed as-is: their string form
+    # is one-to-one with the value, so only text columns pay for .str ops.
+    def _norm(col: pd.Series) -> pd.Series:
+        if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+            return col
+        return col.astype(str).str.strip().str.lower().where(col.notna(), "")
+
+    df_norm = pd.DataFrame(
+        {i: _norm(df_clean.iloc[:, i]) for i in range(df_clean.shape[1])},
+        index=df_clean.index,
     )
 
-    dup_mask    = df_norm.duplicated(keep=False)
-    dup_indices = set(df_norm[dup_mask].index.tolist())
+    # One uint64 hash per row, reused for the duplicate mask and the groups
+    # (no joined-string key per row)
+    if df_norm.shape[1] == 0:
+        return {"count": 0, "groups": [], "duplicate_indices": set()}
+    keys = pd.util.hash_pandas_object(df_norm, index=False)
+
+    # Factorize the row hashes once: group sizes are a bincount of the codes
+    # and the duplicate mask indexes it — no second hash pass via isin
+    codes, _ = pd.factorize(keys)
+    sizes    = np.bincount(codes)
+    dup_mask = sizes[codes] > 1
+
+    dup_indices = set(df_norm.index[dup_mask].tolist())
     dup_count   = int(dup_mask.sum())
 
     groups = []
     if dup_count > 0:
-        df_norm["__group_key__"] = df_norm.apply(
-            lambda row: "|||".join(str(v) for v in row), axis=1
-        )
-        group_counts = df_norm["__group_key__"].value_counts()
-        top_groups   = group_counts[group_counts > 1].head(10)
-
-        for key, cnt in top_groups.items():
-            sample_idx = df_norm[df_norm["__group_key__"] == key].index[0]
+        # Codes number the hashes in order of first appearance, so a code's
+        # first row is where the running max of the codes steps up
+        run_max   = np.maximum.accumulate(codes)
+        first_pos = np.flatnonzero(np.r_[True, run_max[1:] > run_max[:-1]])
+        dup_codes = np.flatnonzero(sizes > 1)
+        top_codes = dup_codes[np.argsort(-sizes[dup_codes], kind="stable")][:10]
+
+        for code in top_codes:
+            sample_idx = df_norm.index[first_pos[code]]
             sample = {}
             for col in list(df_clean.columns)[:4]:
                 val = df_clean.loc[sample_idx, col]
                 sample[col] = str(val) if pd.notna(val) else ""
-            groups.append({"count": int(cnt), "sample": sample})
+            groups.append({"count": int(sizes[code]), "sample": sample})
 
     return {
         "count":             dup_count,
@@ -602,6 +1292,9 @@ def detect_exact_duplicates(df: pd.DataFrame) -> dict:
     }
 
 
+FILL_EMPTY_VALUES = ("", "nan", "none", "null")
+
+
 def get_column_fill_rates(df: pd.DataFrame) -> list:
     """
     Calculate fill rate (% non-empty) for each column.
@@ -615,11 +1308,13 @@ def get_column_fill_rates(df: pd.DataFrame) -> list:
         return []
 
     result = []
-    for col in df_clean.columns:
-        non_empty = df_clean[col].apply(
-            lambda v: pd.notna(v)
-            and str(v).strip() not in ("", "nan", "none", "null")
-        ).sum()
+    for col_idx, col in enumerate(df_clean.columns):
+        s = df_clean.iloc[:, col_idx]
+        filled = s.notna()
+        # Numbers / dates never stringify to a placeholder; only text is checked
+        if not (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s)):
+            filled &= ~s.astype(str).str.strip().isin(FILL_EMPTY_VALUES)
+        non_empty = int(filled.sum())
         fill_rate = round((non_empty / total) * 100, 1)
         result.append({
             "column":      str(col),
@@ -9,29 +9,53 @@ Multi-tenant upload:
 """
 
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 from fastapi import APIRouter, UploadFile, File, Form, Request, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from datetime import datetime
 import os
-import shutil
 import asyncio
+import hashlib
+import threading
+import traceback
+
+import pandas as pd
 
 from auth import get_current_user
 from database import get_db, SessionLocal
 from models import Dataset, Category, UploadLog, User
 from modules import shared
+from utils.user_stats import refresh_user_stats
+from modules.relation import invalidate_dataset
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-TEMP_UPLOAD_DIR = Path("temp_uploads")
-TEMP_UPLOAD_DIR.mkdir(exist_ok=True)
+# 4 MB chunks — streams large files without loading into RAM
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Uploads bigger than this get their full size reserved on disk up front
+# (contiguous extents, no per-chunk file growth)
+PREALLOCATE_MIN_BYTES = 64 * 1024 * 1024
+
+# Large files are parsed in separate processes: pandas holds the GIL for
+# minutes on a multi-hundred-MB file and would starve the web worker.
+# Sized independently of web concurrency; created on first use.
+LARGE_FILE_WORKERS = 2
+_large_file_pool = None
+_large_file_pool_lock = threading.Lock()
 
-# 1 MB chunks — streams large files without loading into RAM
-CHUNK_SIZE = 1024 * 1024
+
+def _get_large_file_pool() -> ProcessPoolExecutor:
+    global _large_file_pool
+    with _large_file_pool_lock:
+        if _large_file_pool is None:
+            _large_file_pool = ProcessPoolExecutor(max_workers=LARGE_FILE_WORKERS)
+        return _large_file_pool
 
 
 def get_user_upload_dir(user_id: int) -> Path:
@@ -41,55 +65,116 @@ def get_user_upload_dir(user_id: int) -> Path:
     return user_dir
 
 
-async def save_upload_chunked(upload_file: UploadFile, dest: Path) -> int:
+def get_partial_upload_path(user_id: int, filename: str) -> Path:
+    """
+    Where an upload lives until it's accepted: uploads/{user_id}/{filename}.part
+    Same directory (and filesystem) as the final file, so accepting it is a
+    rename instead of a copy.
+    """
+    return get_user_upload_dir(user_id) / f"{filename}.part"
+
+
+async def save_upload_chunked(upload_file: UploadFile, dest: Path) -> tuple:
     """
     Stream UploadFile to disk in CHUNK_SIZE chunks.
-    Non-blocking — never loads the whole file into RAM.
-    Returns total bytes written.
+    Non-blocking — never loads the whole file into RAM, and disk writes
+    run in a worker thread so slow disks don't stall the event loop.
+    Returns (total bytes written, SHA-256 hex digest of the content).
     """
     total_bytes = 0
-    with open(dest, "wb") as f:
-        while True:
-            chunk = await upload_file.read(CHUNK_SIZE)
-            if not chunk:
-                break
+    hasher = hashlib.sha256()
+    expected = upload_file.size or 0
+    f = await asyncio.to_thread(open, dest, "wb")
+    try:
+        preallocated = False
+        if expected > PREALLOCATE_MIN_BYTES and hasattr(os, "posix_fallocate"):
+            try:
+                await asyncio.to_thread(os.posix_fallocate, f.fileno(), 0, expected)
+                preallocated = True
+            except OSError:
+                pass   # filesystem without fallocate support — write as usual
+        def write_chunk(chunk: bytes):
             f.write(chunk)
+            hasher.update(chunk)
+
+        while chunk := await upload_file.read(CHUNK_SIZE):
+            await asyncio.to_thread(write_chunk, chunk)
             total_bytes += len(chunk)
-    return total_bytes
+        if preallocated and total_bytes != expected:
+            await asyncio.to_thread(f.truncate, total_bytes)
+    finally:
+        await asyncio.to_thread(f.close)
+    return total_bytes, hasher.hexdigest()
+
+
+def _process_large_file(file_path: str):
+    """
+    Runs in a worker process (see _get_large_file_pool).
+    Reads the file, marks duplicates and writes its cleaned copy next to it.
+    Returns (stats, phone_col, email_col), or None if the file has no data.
+    """
+    df = shared.read_file(file_path)
+    if df is None or df.empty:
+        return None
 
+    df_marked = shared.detect_duplicates(df)
+    stats = shared.get_duplicate_stats(df_marked)
 
-def process_large_file_background(dataset_id: int, file_path: str, safe_filename: str, user_upload_dir: str):
+    # Save cleaned copy for the view / relation pages
+    shared.save_cleaned(df_marked, file_path, sidecar=True)
+
+    phone_col, email_col = shared.detect_contact_cols(df.columns)
+    return stats, phone_col, email_col
+
+
+def process_large_file_background(dataset_id: int, file_path: str, safe_filename: str):
     """
     Background task: runs AFTER HTTP response is returned to user.
-    Handles slow pandas processing for large files (100k+ rows).
-    Updates the dataset row_count, actual_records, duplicate_records once done.
+    Hands the slow pandas processing for large files (100k+ rows) to a
+    worker process and waits for it off the event loop.
+    Updates the dataset row_count, actual_records, duplicate_records once
+    done and logs the outcome to UploadLog.
     """
     db = SessionLocal()
     try:
-        df = shared.read_file(file_path)
-        if df is None or df.empty:
+        result = _get_large_file_pool().submit(_process_large_file, file_path).result()
+        if result is None:
+            db.add(UploadLog(file_name=safe_filename, status="FAILED",
+                             message="File is empty or contains no valid data"))
+            db.commit()
             return
+        stats, phone_col, email_col = result
+
+        # Update DB record with real counts — one UPDATE ... RETURNING
+        # (no SELECT first), committed together with the log entry
+        user_id = db.execute(
+            update(Dataset)
+            .where(Dataset.id == dataset_id)
+            .values(
+                row_count=stats["total_records"],
+                actual_records=stats["actual_records"],
+                duplicate_records=stats["duplicate_records"],
+                phone_col=phone_col,
+                email_col=email_col,
+            )
+            .returning(Dataset.user_id)
+        ).scalar_one_or_none()
+        db.add(UploadLog(file_name=safe_filename, status="SUCCESS",
+                         message=f"Background processing complete — {stats['total_records']} rows"))
+        db.commit()
 
-        shared.set_cached_df(safe_filename, df)
-        df_marked = shared.detect_duplicates(df)
-        stats = shared.get_duplicate_stats(df_marked)
-
-        # Save cleaned CSV for reference
-        cleaned_path = Path(user_upload_dir) / f"cleaned_{safe_filename}"
-        df_marked.to_csv(cleaned_path, index=False)
-
-        # Update DB record with real counts
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if dataset:
-            dataset.row_count        = stats["total_records"]
-            dataset.actual_records   = stats["actual_records"]
-            dataset.duplicate_records = stats["duplicate_records"]
-            db.commit()
+        if user_id is not None:
+            refresh_user_stats(db, user_id)
+            # The cleaned copy now exists — relation caches built before it
+            # (from the raw file) must not be served again
+            invalidate_dataset(dataset_id)
 
     except Exception as e:
         print(f"❌ Background processing error for dataset {dataset_id}: {e}")
-        import traceback
         traceback.print_exc()
+        db.rollback()
+        db.add(UploadLog(file_name=safe_filename, status="FAILED", message=str(e)))
+        db.commit()
     finally:
         db.close()
 
@@ -158,12 +243,30 @@ async def upload_file(
                 status_code=400,
             )
 
-        # ── Stream file to temp dir (async, chunked — no RAM limit) ─────
+        # ── Stream file to <name>.part in the user's dir (async, chunked) ─
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safe_filename = f"{timestamp}_{file.filename}"
-        temp_file_path = TEMP_UPLOAD_DIR / safe_filename
-
-        await save_upload_chunked(file, temp_file_path)
+        user_upload_dir = get_user_upload_dir(user_id)
+        final_file_path = user_upload_dir / safe_filename
+        temp_file_path = get_partial_upload_path(user_id, safe_filename)
+
+        _, content_hash = await save_upload_chunked(file, temp_file_path)
+
+        # ── Same bytes already processed into this category → open it ───
+        # A large upload still processing (or one that failed) has
+        # row_count=0, and a different category means the user wants a
+        # separate dataset — both go through the normal upload below.
+        existing = db.query(Dataset).filter(
+            Dataset.user_id == user_id,
+            Dataset.content_hash == content_hash,
+            Dataset.category_id == category.id,
+            Dataset.row_count > 0,
+        ).order_by(Dataset.id.desc()).first()
+
+        if existing and os.path.exists(existing.file_path):
+            os.remove(temp_file_path)
+            print(f"♻️ {file.filename} matches dataset {existing.id} — skipping processing")
+            return RedirectResponse(f"/view/{existing.id}", status_code=303)
 
         # ── Check file size after saving ─────────────────────────────────
         file_size_mb = temp_file_path.stat().st_size / (1024 * 1024)
@@ -174,9 +277,7 @@ async def upload_file(
         LARGE_FILE_THRESHOLD_MB = 20
 
         if file_size_mb > LARGE_FILE_THRESHOLD_MB:
-            user_upload_dir = get_user_upload_dir(user_id)
-            final_file_path = user_upload_dir / safe_filename
-            shutil.move(str(temp_file_path), str(final_file_path))
+            os.replace(temp_file_path, final_file_path)
 
             # Save DB record immediately so user sees it on dashboard
             dataset = Dataset(
@@ -186,6 +287,7 @@ async def upload_file(
                 category_id=category.id,
                 user_id=user_id,
                 description=description,
+                content_hash=content_hash,
                 row_count=0,           # will be updated by background task
                 actual_records=0,
                 duplicate_records=0,
@@ -193,6 +295,7 @@ async def upload_file(
             db.add(dataset)
             db.commit()
             db.refresh(dataset)
+            refresh_user_stats(db, user_id)
 
             # Log
             log = UploadLog(
@@ -209,14 +312,13 @@ async def upload_file(
                 dataset.id,
                 str(final_file_path),
                 safe_filename,
-                str(user_upload_dir),
             )
 
             return RedirectResponse("/dashboard", status_code=303)
 
         # ── Normal path (files ≤20MB) — process inline ──────────────────
         try:
-            df = shared.read_file(str(temp_file_path))
+            df = await asyncio.to_thread(shared.read_file, str(temp_file_path))
             shared.set_cached_df(safe_filename, df)
         except Exception as e:
             if temp_file_path and temp_file_path.exists():
@@ -256,18 +358,17 @@ async def upload_file(
         db.add(log)
         db.commit()
 
-        user_upload_dir = get_user_upload_dir(user_id)
-
         if has_required:
             # ── AUTO-UPLOAD PATH ─────────────────────────────────────────
-            df_marked = shared.detect_duplicates(df)
+            phone_col, email_col = shared.detect_contact_cols(df.columns)
+            # pandas work and the cleaned-copy write run in a worker thread
+            # so the event loop keeps serving other requests meanwhile
+            df_marked = await asyncio.to_thread(shared.detect_duplicates, df)
             stats = shared.get_duplicate_stats(df_marked)
 
-            final_file_path = user_upload_dir / safe_filename
-            shutil.move(str(temp_file_path), str(final_file_path))
+            os.replace(temp_file_path, final_file_path)
 
-            cleaned_file_path = user_upload_dir / f"cleaned_{safe_filename}"
-            df_marked.to_csv(cleaned_file_path, index=False)
+            await asyncio.to_thread(shared.save_cleaned, df_marked, str(final_file_path), sidecar=True)
 
             dataset = Dataset(
                 file_name=file.filename,
@@ -276,13 +377,17 @@ async def upload_file(
                 category_id=category.id,
                 user_id=user_id,
                 description=description,
+                content_hash=content_hash,
                 row_count=stats["total_records"],
                 actual_records=stats["actual_records"],
                 duplicate_records=stats["duplicate_records"],
+                phone_col=phone_col,
+                email_col=email_col,
             )
 
             db.add(dataset)
             db.commit()
+            refresh_user_stats(db, user_id)
 
             return RedirectResponse("/dashboard", status_code=303)
 
@@ -341,11 +446,11 @@ async def fix_column_mapping(
         if not temp_filename or not mapping:
             raise HTTPException(400, "Missing mapping data")
 
-        temp_path = TEMP_UPLOAD_DIR / temp_filename
+        temp_path = get_partial_upload_path(user_id, temp_filename)
         if not temp_path.exists():
             raise HTTPException(404, "Temp file not found. Please re-upload.")
 
-        df = shared.read_file(str(temp_path))
+        df = await asyncio.to_thread(shared.read_file, str(temp_path))
         if df is None or df.empty:
             raise HTTPException(400, "Failed to read file")
 
@@ -354,27 +459,26 @@ async def fix_column_mapping(
         # the original file had no valid header, row 0 was actual data that
         # got consumed as column names and dropped from the dataframe.
         # We rebuild it from df.columns and insert it back as row 0.
-        import pandas as pd
         problem_reason = form.get("problem_reason", "")
         if problem_reason == "no_header_detected":
             first_row = pd.DataFrame([df.columns.tolist()], columns=df.columns)
             df = pd.concat([first_row, df], ignore_index=True)
 
+        # Exports read the original file, so detect on its (unmapped) headers
+        phone_col, email_col = shared.detect_contact_cols(df.columns)
+
         df = shared.apply_column_mapping(df, mapping)
-        df_marked = shared.detect_duplicates(df)
+        df_marked = await asyncio.to_thread(shared.detect_duplicates, df)
         stats = shared.get_duplicate_stats(df_marked)
 
         user_upload_dir = get_user_upload_dir(user_id)
 
         final_path = user_upload_dir / temp_filename
-        shutil.move(str(temp_path), str(final_path))
+        os.replace(temp_path, final_path)
 
-        temp_path_obj = Path(temp_filename)
-        cleaned_name = f"cleaned_{temp_path_obj.stem}.csv"
-        cleaned = user_upload_dir / cleaned_name
-        df_marked.to_csv(cleaned, index=False)
+        cleaned = await asyncio.to_thread(shared.save_cleaned, df_marked, str(final_path))
 
-        shared.cache_dataframe(cleaned_name, df_marked)
+        shared.cache_dataframe(os.path.basename(cleaned), df_marked)
 
         # ── Category must belong to this user ────────────────────────────
         category = db.query(Category).filter(
@@ -392,24 +496,30 @@ async def fix_column_mapping(
             row_count=stats["total_records"],
             actual_records=stats["actual_records"],
             duplicate_records=stats["duplicate_records"],
+            phone_col=phone_col,
+            email_col=email_col,
         )
 
         db.add(dataset)
         db.commit()
         db.refresh(dataset)
+        refresh_user_stats(db, user_id)
 
         return RedirectResponse(url=f"/view/{dataset.id}", status_code=303)
 
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(500, f"Header correction failed: {str(e)}")
 
 
 @router.post("/upload/auto-detect")
 async def auto_detect_columns(request: Request):
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"status": "error", "message": "Not authenticated"}, status_code=401)
+
     try:
         data = await request.json()
         temp_filename = data.get("temp_filename")
@@ -417,11 +527,11 @@ async def auto_detect_columns(request: Request):
         if not temp_filename:
             return JSONResponse({"status": "error", "message": "Missing filename"}, status_code=400)
 
-        temp_file_path = TEMP_UPLOAD_DIR / temp_filename
+        temp_file_path = get_partial_upload_path(user["id"], temp_filename)
         if not temp_file_path.exists():
             return JSONResponse({"status": "error", "message": "File not found"}, status_code=404)
 
-        df = shared.read_file(str(temp_file_path))
+        df = await asyncio.to_thread(shared.read_file, str(temp_file_path))
         column_analysis = shared.analyze_file_columns(df)
 
         message = "Auto-detection complete"
@@ -19,80 +19,36 @@ from database import get_db
 from models import Dataset, User
 from modules import shared
 from utils.permissions import get_effective_user
+from utils.user_stats import refresh_user_stats
+from modules.relation import invalidate_dataset
 
 router = APIRouter(tags=["view"])
 templates = Jinja2Templates(directory="templates")
 
+# (dataset_id, load_path, file mtime) -> (marked DataFrame, sidebar_stats).
+# A newer mtime is a different key, so an edited file is recomputed.
+VIEW_CACHE = shared.LRUCache(maxsize=8)
 
-@router.get("/view/{dataset_id}", response_class=HTMLResponse)
-def view_dataset(
-    dataset_id: int,
-    request: Request,
-    db: Session = Depends(get_db),
-):
-    # ✅ Check authentication
-    user = get_current_user(request)
-    if not user:
-        return RedirectResponse("/login", status_code=302)
-    
-    # Get effective user (for admin viewing other users' data)
-    effective_user = get_effective_user(request, db)
-    is_admin = user.get("role") == "admin"
-
-# Admin with no selected user can open any dataset directly
-    if not effective_user and not is_admin:
-      raise HTTPException(status_code=403, detail="Select a user first")
-
-# Admin with no selected user → fetch by ID only (no user scope)
-    if is_admin and not effective_user:
-     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-    else:
-     dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id,
-        Dataset.user_id == effective_user.id,
-      ).first()
-   
-    if not dataset:
-        raise HTTPException(404, "Dataset not found")
-    
-    owner_id = effective_user.id if effective_user else dataset.user_id
-    print(f"📂 Loading dataset: {dataset.file_name} (owner id={owner_id})")
-    
-    # Query params
-    show     = request.query_params.get("show")
-    page     = int(request.query_params.get("page", 1))
-    search   = request.query_params.get("search", "").strip()
-    per_page = int(request.query_params.get("per_page", 10))
-    if per_page not in [10, 20, 50, 100, 150]:
-        per_page = 10
-    
-    # ── Resolve paths ────────────────────────────────────────────────────
-    # Always prefer the cleaned (header-corrected) file if it exists.
-    # The correction page saves it as "cleaned_<stem>.csv" in the same dir.
-    raw_path     = dataset.file_path
-    raw_dir      = os.path.dirname(raw_path)
-    raw_stem     = os.path.splitext(os.path.basename(raw_path))[0]
-    cleaned_path = os.path.join(raw_dir, f"cleaned_{raw_stem}.csv")
 
+def _build_view_frame(dataset: Dataset, db: Session, raw_stem: str, load_path: str, cleaned_path):
+    """
+    Load the dataset, mark phone/email/exact duplicates and compute the
+    sidebar stats. Writes the fresh counts back to the Dataset row.
+    Returns (df, sidebar_stats); view_dataset caches both per file version.
+    """
     # Use a cache key that reflects WHICH file is actually loaded so that
     # correcting headers doesn't serve the old cached original file.
-    cache_key = f"cleaned_{raw_stem}" if os.path.exists(cleaned_path) else dataset.file_name
+    cache_key = f"cleaned_{raw_stem}" if cleaned_path else dataset.file_name
 
     # Load dataframe (cache first, then file)
     df = shared.get_cached_df(cache_key)
 
     if df is None:
         print("⚠️ Cache miss — reloading from file...")
-
-        load_path = cleaned_path if os.path.exists(cleaned_path) else raw_path
-
-        if not os.path.exists(load_path):
-            raise HTTPException(404, "File missing on server")
-
         print(f"📂 Loading from: {load_path}")
 
         try:
-            df = shared.read_file(load_path)
+            df = shared.read_cleaned(load_path, dataset.file_path)
         except Exception as e:
             print("❌ File load error:", e)
             raise HTTPException(500, "Could not read dataset file")
@@ -105,8 +61,13 @@ def view_dataset(
     
     print(f"📊 DataFrame loaded: {df.shape}")
     
-    # Duplicate detection
+    # Upload saves the duplicate-marked frame as the cleaned copy, so the
+    # __dup_* columns are normally already here. Datasets from before that
+    # (no cleaned copy yet) are marked once and backfilled to disk. The
+    # backfill is best-effort: the page still renders if it fails.
     if "__dup_combined__" not in df.columns:
+        print("🛠️ No cleaned copy — marking duplicates and saving one")
+        from_raw = load_path == dataset.file_path
         try:
             df = shared.detect_duplicates(df)
         except Exception as e:
@@ -114,51 +75,48 @@ def view_dataset(
             df["__dup_combined__"] = False
             df["__dup_phone__"] = False
             df["__dup_email__"] = False
-    
-    # Ensure all duplicate columns exist
-    if "__dup_combined__" not in df.columns:
-        df["__dup_combined__"] = False
-    if "__dup_phone__" not in df.columns:
-        df["__dup_phone__"] = False
-    if "__dup_email__" not in df.columns:
-        df["__dup_email__"] = False
+        else:
+            try:
+                shared.save_cleaned(df, dataset.file_path, sidecar=from_raw)
+            except Exception as e:
+                print("❌ Cleaned copy backfill error:", e)
     
     # Calculate stats BEFORE filtering
     total_records = len(df)
-    duplicate_records = int(df["__dup_combined__"].sum())
-    phone_duplicates  = int(df["__dup_phone__"].sum())
-    email_duplicates  = int(df["__dup_email__"].sum())
+    flag_counts = df[["__dup_combined__", "__dup_phone__", "__dup_email__"]].sum()
+    duplicate_records = int(flag_counts["__dup_combined__"])
+    phone_duplicates  = int(flag_counts["__dup_phone__"])
+    email_duplicates  = int(flag_counts["__dup_email__"])
     actual_records = total_records - duplicate_records
 
     print(f"📊 Stats: Total={total_records}, Duplicates={duplicate_records}, Actual={actual_records}")
 
     # ── Exact duplicate detection (full-row match) ────────────────────────
     exact_dup_data = shared.detect_exact_duplicates(df)
-    exact_dup_count = exact_dup_data["count"]
-    exact_dup_groups = exact_dup_data["groups"]
 
     # ── Column fill rates (for visualisation sidebar) ─────────────────────
     column_fill_rates = shared.get_column_fill_rates(df)
 
-    # ── Top duplicate values for sidebar (phone/email) ────────────────────
-    import json as _json
     sidebar_stats = {
         "total": total_records,
         "actual": actual_records,
         "combined": duplicate_records,
         "phone": phone_duplicates,
         "email": email_duplicates,
-        "exact": exact_dup_count,
-        "exact_groups": exact_dup_groups,
+        "exact": exact_dup_data["count"],
+        "exact_groups": exact_dup_data["groups"],
         "fill_rates": column_fill_rates,
         "health_score": round((actual_records / total_records) * 100, 1) if total_records else 100,
     }
     
     # Update database with fresh counts (in case they changed)
+    counts_changed = (dataset.row_count, dataset.duplicate_records) != (total_records, duplicate_records)
     dataset.row_count = total_records
     dataset.duplicate_records = duplicate_records
     dataset.actual_records = actual_records
     db.commit()
+    if counts_changed:
+        refresh_user_stats(db, dataset.user_id)
     print(f"💾 Database updated: row_count={total_records}, duplicates={duplicate_records}, actual={actual_records}")
     
     # Mark exact duplicate rows in df using the indices from detect_exact_duplicates
@@ -167,12 +125,85 @@ def view_dataset(
     else:
         df["__exact_dup__"] = False
 
+    return df, sidebar_stats
+
+
+@router.get("/view/{dataset_id}", response_class=HTMLResponse)
+def view_dataset(
+    dataset_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    # ✅ Check authentication
+    user = get_current_user(request)
+    if not user:
+        return RedirectResponse("/login", status_code=302)
+    
+    # Get effective user (for admin viewing other users' data)
+    effective_user = get_effective_user(request, db)
+    is_admin = user.get("role") == "admin"
+
+# Admin with no selected user can open any dataset directly
+    if not effective_user and not is_admin:
+      raise HTTPException(status_code=403, detail="Select a user first")
+
+# Admin with no selected user → fetch by ID only (no user scope)
+    if is_admin and not effective_user:
+     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    else:
+     dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id,
+        Dataset.user_id == effective_user.id,
+      ).first()
+   
+    if not dataset:
+        raise HTTPException(404, "Dataset not found")
+    
+    owner_id = effective_user.id if effective_user else dataset.user_id
+    print(f"📂 Loading dataset: {dataset.file_name} (owner id={owner_id})")
+    
+    # Query params
+    show     = request.query_params.get("show")
+    page     = int(request.query_params.get("page", 1))
+    search   = request.query_params.get("search", "").strip()
+    per_page = int(request.query_params.get("per_page", 10))
+    if per_page not in [10, 20, 50, 100, 150]:
+        per_page = 10
+    
+    # ── Resolve paths ────────────────────────────────────────────────────
+    # Always prefer the cleaned (header-corrected) file if it exists.
+    # Upload saves it as "cleaned_<stem>.parquet" (older: .csv) in the same dir.
+    raw_path     = dataset.file_path
+    raw_stem     = os.path.splitext(os.path.basename(raw_path))[0]
+    cleaned_path = shared.cleaned_path_for(raw_path)
+    load_path    = cleaned_path or raw_path
+
+    if not os.path.exists(load_path):
+        raise HTTPException(404, "File missing on server")
+
+    # Marked frame + sidebar stats only change with the file: paging,
+    # filtering and searching reuse them instead of recomputing
+    view_key = (dataset.id, load_path, os.path.getmtime(load_path))
+    cached   = VIEW_CACHE.get(view_key)
+
+    if cached is not None:
+        df, sidebar_stats = cached
+    else:
+        df, sidebar_stats = _build_view_frame(dataset, db, raw_stem, load_path, cleaned_path)
+        VIEW_CACHE[view_key] = (df, sidebar_stats)
+
+    phone_duplicates  = sidebar_stats["phone"]
+    email_duplicates  = sidebar_stats["email"]
+    exact_dup_count   = sidebar_stats["exact"]
+    exact_dup_groups  = sidebar_stats["exact_groups"]
+    column_fill_rates = sidebar_stats["fill_rates"]
+
     # Filter based on mode
     if show == "duplicates":
-        df = df[df["__dup_combined__"] == True]
+        df = df.iloc[df["__dup_combined__"].to_numpy(dtype=bool)]
         print(f"🔍 Filtered to duplicates only: {len(df)} rows")
     elif show == "exact":
-        df = df[df["__exact_dup__"] == True]
+        df = df.iloc[df["__exact_dup__"].to_numpy(dtype=bool)]
         print(f"🔍 Filtered to exact duplicates only: {len(df)} rows")
 
     # ── Live search filter (across all non-internal columns) ─────────────
@@ -203,6 +234,17 @@ def view_dataset(
     start = (page - 1) * rows_per_page
     end = start + rows_per_page
     df_page = df.iloc[start:end]
+
+    # Row dicts for the template, built from one .tolist() per column
+    # (repeated column names can't be selected one by one — use to_dict)
+    page_columns = df_page.columns.tolist()
+    if df_page.columns.is_unique:
+        page_rows = [
+            dict(zip(page_columns, values))
+            for values in zip(*(df_page[c].tolist() for c in page_columns))
+        ]
+    else:
+        page_rows = df_page.to_dict(orient="records")
     
     max_links = 5
     start_page = max(1, page - max_links // 2)
@@ -216,8 +258,8 @@ def view_dataset(
         "user": user,
         "active_page": "dashboard",
         "dataset": dataset,
-        "columns": df_page.columns.tolist(),
-        "rows": df_page.to_dict(orient="records"),
+        "columns": page_columns,
+        "rows": page_rows,
         "page": page,
         "total_pages": total_pages,
         "start_page": start_page,
@@ -270,7 +312,6 @@ def delete_dataset(
         raise HTTPException(404, "Dataset not found")
     
     # Remove file from disk
-    import os
     if os.path.exists(dataset.file_path):
         try:
             os.remove(dataset.file_path)
@@ -279,6 +320,9 @@ def delete_dataset(
     
     db.delete(dataset)
     db.commit()
+    refresh_user_stats(db, user_id)
+    invalidate_dataset(dataset_id)
+    VIEW_CACHE.discard_where(lambda k: k[0] == dataset_id)
     
     print(f"🗑️ Deleted dataset {dataset_id} for user {user_id}")
     
@@ -4,11 +4,18 @@ import os
 import tempfile
 import re
 import numpy as np
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from modules import shared
 # ===============================
 # GLOBAL NORMALIZERS
 # ===============================
 
+# Compiled once at import instead of a regex-cache lookup per value
+NON_DIGIT_PATTERN = re.compile(r"[^\d]")
+EMAIL_PATTERN     = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+
+
 def clean_phone_global(x):
     """Clean and normalize phone numbers"""
     if pd.isna(x):
@@ -19,7 +26,7 @@ def clean_phone_global(x):
     if x.endswith(".0"):
         x = x[:-2]
 
-    x = re.sub(r"[^\d]", "", x)
+    x = NON_DIGIT_PATTERN.sub("", x)
 
     if x.startswith("91") and len(x) > 10:
         x = x[2:]
@@ -37,14 +44,108 @@ def clean_email_global(x):
 
     x = str(x).strip().lower()
 
-    pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-
-    if re.match(pattern, x):
+    if EMAIL_PATTERN.match(x):
         return x
 
     return None
 
 
+# ZIP members are processed in a small shared worker pool, created on first
+# use — not a new cpu_count-sized pool per request
+ZIP_WORKERS = 2
+_zip_pool = None
+_zip_pool_lock = threading.Lock()
+
+
+def _get_zip_pool() -> ProcessPoolExecutor:
+    global _zip_pool
+    with _zip_pool_lock:
+        if _zip_pool is None:
+            _zip_pool = ProcessPoolExecutor(max_workers=ZIP_WORKERS)
+        return _zip_pool
+
+
+# Phone / email use shared's compiled keyword alternations so both pages
+# always detect the same columns; names are only looked for here
+NAME_KEYWORDS = ("name", "user", "customer", "client", "person", "candidate", "applicant")
+NAME_EXCLUDES = ("file", "user_name", "username")
+
+
+def classify_columns(cols):
+    """Split lowercase column names into (phone_cols, email_cols, name_cols) in one pass"""
+    phone_cols, email_cols, name_cols = [], [], []
+    for c in cols:
+        if shared.is_phone_col(c):
+            phone_cols.append(c)
+        if shared.is_email_col(c):
+            email_cols.append(c)
+        if any(k in c for k in NAME_KEYWORDS) and not any(b in c for b in NAME_EXCLUDES):
+            name_cols.append(c)
+    return phone_cols, email_cols, name_cols
+
+
+def clean_phone_series(s: pd.Series) -> pd.Series:
+    """clean_phone_global over a whole column (same rules as shared)"""
+    return shared.normalize_phone_series(s)
+
+
+def clean_email_series(s: pd.Series) -> pd.Series:
+    """clean_email_global over a whole column via .str ops"""
+    val = s.astype(str).str.strip().str.lower()
+    valid = s.notna() & val.str.match(EMAIL_PATTERN).fillna(False).astype(bool)
+    return val.astype(object).where(valid, None)
+
+
+def join_name_columns(df: pd.DataFrame, name_cols: list) -> pd.Series:
+    """
+    Space-join the usable name parts of each row (stripped, skipping blank /
+    nan / none / null), one column at a time instead of a lambda per row.
+    """
+    joined = None
+    for col in name_cols:
+        part = df[col].fillna("").astype(str).str.strip()
+        part = part.where(~part.str.lower().isin(["", "nan", "none", "null"]), "")
+        if joined is None:
+            joined = part
+            continue
+        joined = joined.where(part == "", (joined + " " + part).str.lstrip())
+    return joined
+
+
+def _group_key(frame: pd.DataFrame, col: str) -> pd.Series:
+    """
+    frame[col] as a groupby key. With pyarrow installed the cleaned strings
+    are cast to string[pyarrow] so grouping hashes Arrow buffers instead of
+    one Python str per row; the aggregated columns stay object so their
+    lists still hold plain str / None.
+    """
+    if shared._PYARROW_OK:
+        return frame[col].astype("string[pyarrow]")
+    return frame[col]
+
+
+def _group_lists(data: pd.DataFrame, key_cols: list, lists: dict) -> pd.DataFrame:
+    """
+    One row per key group (sorted by key): the key columns, "row_count"
+    (every row), and for each name -> col in lists the group's distinct col
+    values in first-seen row order.
+
+    Repeated (key, value) pairs are dropped first, so a huge group of the
+    same few names stays short. The lists are cut from one stable sort of
+    the group codes rather than agg(list), which slices a Series per group.
+    """
+    grouped = data.groupby([_group_key(data, c) for c in key_cols]).size().to_frame("row_count")
+    for name, col in lists.items():
+        distinct = data.drop_duplicates(subset=key_cols + [col])
+        # ngroup() numbers groups in the same sorted key order as grouped
+        codes  = distinct.groupby([_group_key(distinct, c) for c in key_cols]).ngroup().to_numpy()
+        order  = np.argsort(codes, kind="stable")
+        values = distinct[col].to_numpy(dtype=object)[order].tolist()
+        ends   = np.cumsum(np.bincount(codes, minlength=len(grouped))).tolist()
+        grouped[name] = [values[start:end] for start, end in zip([0] + ends[:-1], ends)]
+    return grouped.reset_index()
+
+
 # =========================
 # FILE READER FUNCTION
 # =========================
@@ -69,73 +170,29 @@ def process_dataframe(df: pd.DataFrame):
     if df is None or df.empty:
         return {"combined": [], "phone": [], "email": []}
 
-    df = df.copy()
-    df.columns = df.columns.str.lower().str.strip()
+    columns = df.columns.str.lower().str.strip()
 
     # ── Strict column detection (same as shared.py) ──────────────────────
-    PHONE_KEYWORDS = [
-        "phone_no", "contact_no", "phone", "mobile", "cell",
-        "tel", "mob", "phoneno", "mobileno", "contactno"
-    ]
-    PHONE_EXCLUDES = [
-        "zip", "pin", "postal", "code", "index", "sr",
-        "ref", "two", "four", "wheeler", "company", "fax"
-    ]
-    EMAIL_KEYWORDS = ["email", "e-mail", "emailid", "emailaddress", "mail"]
-    EMAIL_EXCLUDES = ["name", "username", "filename"]
-
-    phone_cols = [
-        c for c in df.columns
-        if any(k in c for k in PHONE_KEYWORDS)
-        and not any(b in c for b in PHONE_EXCLUDES)
-    ]
-    email_cols = [
-        c for c in df.columns
-        if any(k in c for k in EMAIL_KEYWORDS)
-        and not any(b in c for b in EMAIL_EXCLUDES)
-    ]
-
-    name_cols = [
-        c for c in df.columns
-        if any(k in c for k in ["name", "user", "customer", "client", "person", "candidate", "applicant"])
-        and not any(b in c for b in ["file", "user_name", "username"])
-    ]
+    phone_cols, email_cols, name_cols = classify_columns(columns)
+
+    # Work on the contact / name columns only — everything below would
+    # otherwise copy and scan every column of a wide sheet
+    df = df.set_axis(columns, axis=1)
+    df = df[list(dict.fromkeys(phone_cols + email_cols + name_cols))]
 
     # ── Merge multiple phone columns into one ─────────────────────────────
     phone_col = None
     if len(phone_cols) == 1:
         phone_col = phone_cols[0]
     elif len(phone_cols) > 1:
-        df["__merged_phone__"] = df[phone_cols].apply(
-            lambda row: next(
-                (
-                    str(v).strip().rstrip(".0")
-                    for v in row
-                    if pd.notna(v)
-                    and str(v).strip() not in ("", "nan", "none", "null", "0")
-                ),
-                None,
-            ),
-            axis=1,
-        )
+        df["__merged_phone__"] = shared.merge_phone_columns(df, phone_cols)
         phone_col = "__merged_phone__"
 
     email_col = email_cols[0] if email_cols else None
 
     # ── Name handling ────────────────────────────────────────────────────────
     if name_cols:
-        df["__name__"] = (
-            df[name_cols]
-            .fillna("")
-            .astype(str)
-            .agg(
-                lambda x: " ".join(
-                    v.strip() for v in x
-                    if v.strip() and v.strip().lower() not in ["nan", "none", "null"]
-                ),
-                axis=1,
-            )
-        )
+        df["__name__"] = join_name_columns(df, name_cols)
     else:
         df["__name__"] = ""
 
@@ -144,164 +201,99 @@ def process_dataframe(df: pd.DataFrame):
     df[name_col] = df[name_col].astype(str).str.strip()
     df[name_col] = df[name_col].replace(["nan", "none", "null"], "")
 
-    # ── Clean phone ──────────────────────────────────────────────────────────
-    def clean_phone(x):
-        if pd.isna(x):
-            return None
-        x = str(x).strip()
-        if x.endswith(".0"):
-            x = x[:-2]
-        x = re.sub(r"[^\d]", "", x)
-        if x.startswith("91") and len(x) > 10:
-            x = x[2:]
-        if 7 <= len(x) <= 12:
-            return x
-        return None
-
-    # ── Clean email ──────────────────────────────────────────────────────────
-    def clean_email(x):
-        if pd.isna(x):
-            return None
-        x = str(x).strip().lower()
-        if re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", x):
-            return x
-        return None
-
+    # ── Clean phone / email (column-wide) ────────────────────────────────────
     if phone_col:
-        df[phone_col] = df[phone_col].apply(clean_phone)
+        df[phone_col] = clean_phone_series(df[phone_col])
     if email_col:
-        df[email_col] = df[email_col].apply(clean_email)
-
-    # ── Keep rows that have at least one contact field ────────────────────────
-    if phone_col and email_col:
-        df_filtered = df.dropna(subset=[phone_col, email_col], how="all")
-    elif phone_col:
-        df_filtered = df.dropna(subset=[phone_col])
-    elif email_col:
-        df_filtered = df.dropna(subset=[email_col])
-    else:
-        df_filtered = df
+        df[email_col] = clean_email_series(df[email_col])
 
     results = {"combined": [], "phone": [], "email": []}
 
+    # Null masks computed once and shared by the modes below, instead of a
+    # dropna() copy of the frame per mode. Only rows whose key repeats can
+    # end up in a group of more than one, so each mode also drops the
+    # singletons up front and groups the (usually much smaller) remainder;
+    # list is passed as the builtin, not lambda x: list(x)
+    phone_ok = df[phone_col].notna() if phone_col else None
+    email_ok = df[email_col].notna() if email_col else None
+
     # ── COMBINED (phone AND email both match) ────────────────────────────────
     if phone_col and email_col:
-        temp = df_filtered.dropna(subset=[phone_col, email_col])
+        temp = df[phone_ok & email_ok & df.duplicated(subset=[phone_col, email_col], keep=False)]
 
         if not temp.empty:
-            grouped = (
-                temp
-                .groupby([phone_col, email_col])
-                .agg(
-                    user_names=(name_col, lambda x: list(x)),
-                    row_count=(name_col, "size"),      # real row count
-                )
-                .reset_index()
-            )
-            grouped = grouped[grouped["row_count"] > 1]
-
-            for _, r in grouped.iterrows():
+            grouped = _group_lists(temp, [phone_col, email_col], {"user_names": name_col})
+
+            # zip the columns rather than iterrows() — no per-row Series boxing
+            for phone, email, names, count in zip(
+                grouped[phone_col].tolist(), grouped[email_col].tolist(),
+                grouped["user_names"].tolist(), grouped["row_count"].tolist(),
+            ):
                 results["combined"].append({
-                    "phone":      r[phone_col],
-                    "email":      r[email_col],
-                    "user_names": ", ".join(dict.fromkeys(           # preserve order, dedupe
-                        n for n in r["user_names"] if n.strip()
-                    )),
-                    "user_count": int(r["row_count"]),               # real row count
+                    "phone":      phone,
+                    "email":      email,
+                    "user_names": ", ".join(n for n in names if n.strip()),
+                    "user_count": int(count),                        # real row count
                 })
 
     # ── PHONE (phone appears more than once) ─────────────────────────────────
     # Also collect the set of emails each phone group contains
     # so _build_strict_modes can correctly classify combined vs phone-only
     if phone_col:
-        phone_data = df_filtered.dropna(subset=[phone_col])
+        phone_data = df[phone_ok & df[phone_col].duplicated(keep=False)]
 
         if not phone_data.empty:
+            lists = {"user_names": name_col}
             if email_col:
-                grouped = (
-                    phone_data
-                    .groupby(phone_col)
-                    .agg(
-                        user_names=(name_col, lambda x: list(x)),
-                        row_count=(name_col, "size"),
-                        emails=(email_col, lambda x: list(x)),
-                    )
-                    .reset_index()
-                )
-            else:
-                grouped = (
-                    phone_data
-                    .groupby(phone_col)
-                    .agg(
-                        user_names=(name_col, lambda x: list(x)),
-                        row_count=(name_col, "size"),
-                    )
-                    .reset_index()
-                )
+                lists["emails"] = email_col
+            grouped = _group_lists(phone_data, [phone_col], lists)
+            if not email_col:
                 grouped["emails"] = [[] for _ in range(len(grouped))]
 
-            grouped = grouped[grouped["row_count"] > 1]
-
-            for _, r in grouped.iterrows():
+            for phone, emails, names, count in zip(
+                grouped[phone_col].tolist(), grouped["emails"].tolist(),
+                grouped["user_names"].tolist(), grouped["row_count"].tolist(),
+            ):
                 # Collect unique non-null emails in this phone group
                 emails_in_group = list(dict.fromkeys(
-                    e for e in r["emails"]
+                    e for e in emails
                     if e and str(e).strip() not in ("", "nan", "none", "null")
                 ))
                 results["phone"].append({
-                    "phone":      r[phone_col],
+                    "phone":      phone,
                     "email":      emails_in_group[0] if len(emails_in_group) == 1 else None,
                     "emails":     emails_in_group,   # full list for _build_strict_modes
-                    "user_names": ", ".join(dict.fromkeys(
-                        n for n in r["user_names"] if n.strip()
-                    )),
-                    "user_count": int(r["row_count"]),
+                    "user_names": ", ".join(n for n in names if n.strip()),
+                    "user_count": int(count),
                 })
 
     # ── EMAIL (email appears more than once) ─────────────────────────────────
     # Also collect the set of phones each email group contains
     if email_col:
-        email_data = df_filtered.dropna(subset=[email_col])
+        email_data = df[email_ok & df[email_col].duplicated(keep=False)]
 
         if not email_data.empty:
+            lists = {"user_names": name_col}
             if phone_col:
-                grouped = (
-                    email_data
-                    .groupby(email_col)
-                    .agg(
-                        user_names=(name_col, lambda x: list(x)),
-                        row_count=(name_col, "size"),
-                        phones=(phone_col, lambda x: list(x)),
-                    )
-                    .reset_index()
-                )
-            else:
-                grouped = (
-                    email_data
-                    .groupby(email_col)
-                    .agg(
-                        user_names=(name_col, lambda x: list(x)),
-                        row_count=(name_col, "size"),
-                    )
-                    .reset_index()
-                )
+                lists["phones"] = phone_col
+            grouped = _group_lists(email_data, [email_col], lists)
+            if not phone_col:
                 grouped["phones"] = [[] for _ in range(len(grouped))]
 
-            grouped = grouped[grouped["row_count"] > 1]
-
-            for _, r in grouped.iterrows():
+            for email, phones, names, count in zip(
+                grouped[email_col].tolist(), grouped["phones"].tolist(),
+                grouped["user_names"].tolist(), grouped["row_count"].tolist(),
+            ):
                 phones_in_group = list(dict.fromkeys(
-                    p for p in r["phones"]
+                    p for p in phones
                     if p and str(p).strip() not in ("", "nan", "none", "null")
                 ))
                 results["email"].append({
                     "phone":      phones_in_group[0] if len(phones_in_group) == 1 else None,
                     "phones":     phones_in_group,   # full list for _build_strict_modes
-                    "email":      r[email_col],
-                    "user_names": ", ".join(dict.fromkeys(
-                        n for n in r["user_names"] if n.strip()
-                    )),
-                    "user_count": int(r["row_count"]),
+                    "email":      email,
+                    "user_names": ", ".join(n for n in names if n.strip()),
+                    "user_count": int(count),
                 })
 
     return results
@@ -327,31 +319,71 @@ def extract_duplicate_contacts(file_path: str, file_ext: str):
             if not supported:
                 raise ValueError("ZIP does not contain any supported data file")
 
-            temp_dir = tempfile.gettempdir()
-
-            for data_file in supported:
-                extracted_path = z.extract(data_file, temp_dir)
-                ext = data_file.split(".")[-1].lower()
-                try:
-                   df = shared.read_file(extracted_path)
-                except Exception:
-                     df = None
-
-                if df is not None:
-                    result = process_dataframe(df)
-                    all_results["combined"].extend(result["combined"])
-                    all_results["phone"].extend(result["phone"])
-                    all_results["email"].extend(result["email"])
+            # Private directory per call: no clashes between concurrent
+            # requests extracting same-named members, and nothing left
+            # behind in the shared temp dir afterwards
+            with tempfile.TemporaryDirectory(prefix="dupzip_") as temp_dir:
+                extracted_paths = [z.extract(data_file, temp_dir) for data_file in supported]
+
+                # Files inside the archive are independent — spread them over
+                # the worker pool; a single file isn't worth the hand-off
+                if len(extracted_paths) > 1:
+                    per_file = list(_get_zip_pool().map(_process_extracted, extracted_paths))
+                else:
+                    per_file = [_process_extracted(p) for p in extracted_paths]
+
+        for result in per_file:
+            if result is not None:
+                all_results["combined"].extend(result["combined"])
+                all_results["phone"].extend(result["phone"])
+                all_results["email"].extend(result["email"])
 
     # ── Normal single file ───────────────────────────────────────────────────
     else:
-        df = shared.read_file(file_path)
+        df = _read_for_detection(file_path)
 
         if df is None:
             raise ValueError("Unsupported file format or corrupted file")
 
-        all_results = process_dataframe(df)
+        return extract_duplicate_contacts_from_df(df)
+
+    return _merge_modes(all_results)
+
+
+def _is_detector_col(name: str) -> bool:
+    return any(classify_columns([name.lower().strip()]))
+
+
+def _read_for_detection(path: str) -> pd.DataFrame:
+    """
+    shared.read_file(), except that a large plain CSV is parsed chunk by
+    chunk with only the phone / email / name columns process_dataframe
+    reads — the rest of a wide file is never materialised.
+    """
+    if os.path.getsize(path) >= shared.CHUNKED_READ_MIN_BYTES:
+        df = shared.read_csv_columns(path, _is_detector_col)
+        if df is not None:
+            return df
+    return shared.read_file(path)
+
+
+def _process_extracted(path: str):
+    """process_dataframe() for one file pulled out of a ZIP; None if unreadable"""
+    try:
+        df = _read_for_detection(path)
+    except Exception:
+        return None
+    if df is None:
+        return None
+    return process_dataframe(df)
+
+
+def extract_duplicate_contacts_from_df(df: pd.DataFrame):
+    """extract_duplicate_contacts() for a frame the caller already read"""
+    return _merge_modes(process_dataframe(df))
 
+
+def _merge_modes(all_results: dict) -> dict:
     # ── Merge duplicates across files (ZIP only meaningfully uses this) ──────
     all_results["combined"] = _merge_mode(all_results["combined"])
     all_results["phone"]    = _merge_mode(all_results["phone"])
@@ -360,6 +392,10 @@ def extract_duplicate_contacts(file_path: str, file_ext: str):
     return all_results
 
 
+# Name tokens that are placeholders rather than names (compared uppercased)
+_MERGE_SKIP_NAMES = frozenset(("UNKNOWN", "NAN", "NONE", "NULL"))
+
+
 def _merge_mode(mode_data: list) -> list:
     """
     Merge records that share the same (phone, email) key across multiple
@@ -379,22 +415,23 @@ def _merge_mode(mode_data: list) -> list:
     for r in mode_data:
         key = (r["phone"], r["email"])
 
-        if key not in merged:
-            merged[key] = {
+        entry = merged.get(key)                  # one hash lookup per record
+        if entry is None:
+            entry = merged[key] = {
                 "phone":      r["phone"],
                 "email":      r["email"],
-                "user_names": [],
-                "row_count":  r["user_count"],   # start with this file's row count
+                "user_names": {},                # insertion-ordered set
+                "row_count":  0,
             }
-        else:
-            merged[key]["row_count"] += r["user_count"]  # accumulate across files
+        entry["row_count"] += r["user_count"]    # accumulate across files
 
-        # Collect non-empty names (preserve order, dedupe)
+        # Collect non-empty names (preserve order, dedupe) — dict keys give an
+        # O(1) membership test instead of scanning a growing list
+        names = entry["user_names"]
         for n in str(r["user_names"]).split(","):
             n = n.strip()
-            if n and n.upper() not in ("UNKNOWN", "NAN", "NONE", "NULL", ""):
-                if n not in merged[key]["user_names"]:
-                    merged[key]["user_names"].append(n)
+            if n and n.upper() not in _MERGE_SKIP_NAMES:
+                names.setdefault(n, None)
 
     final = []
     for v in merged.values():
@@ -429,6 +466,16 @@ def normalize_email_public(x):
     return clean_email_global(x)
 
 
+def normalize_phone_public_series(s: pd.Series) -> pd.Series:
+    """normalize_phone_public over a whole column"""
+    return clean_phone_series(s)
+
+
+def normalize_email_public_series(s: pd.Series) -> pd.Series:
+    """normalize_email_public over a whole column"""
+    return clean_email_series(s)
+
+
 # ===============================
 # MARK DUPLICATES (for upload preview)
 # ===============================
@@ -439,90 +486,34 @@ def mark_duplicates(df: pd.DataFrame):
     if df is None or df.empty:
         return df
 
-    df = df.copy()
-    df.columns = df.columns.str.lower().str.strip()
-
-    PHONE_KEYWORDS = [
-        "phone_no", "contact_no", "phone", "mobile", "cell",
-        "tel", "mob", "phoneno", "mobileno", "contactno"
-    ]
-    PHONE_EXCLUDES = [
-        "zip", "pin", "postal", "code", "index", "sr",
-        "ref", "two", "four", "wheeler", "company", "fax"
-    ]
-    EMAIL_KEYWORDS = ["email", "e-mail", "emailid", "emailaddress", "mail"]
-    EMAIL_EXCLUDES = ["name", "username", "filename"]
-
-    phone_cols = [
-        c for c in df.columns
-        if any(k in c for k in PHONE_KEYWORDS)
-        and not any(b in c for b in PHONE_EXCLUDES)
-    ]
-    email_cols = [
-        c for c in df.columns
-        if any(k in c for k in EMAIL_KEYWORDS)
-        and not any(b in c for b in EMAIL_EXCLUDES)
-    ]
+    # set_axis instead of copy(): under copy-on-write the result shares the
+    # caller's column data, and only the added columns allocate anything
+    df = df.set_axis(df.columns.str.lower().str.strip(), axis=1)
+
+    phone_cols, email_cols, _ = classify_columns(df.columns)
 
     # Merge multiple phone columns
     phone_col = None
     if len(phone_cols) == 1:
         phone_col = phone_cols[0]
     elif len(phone_cols) > 1:
-        df["__merged_phone__"] = df[phone_cols].apply(
-            lambda row: next(
-                (
-                    str(v).strip().rstrip(".0")
-                    for v in row
-                    if pd.notna(v)
-                    and str(v).strip() not in ("", "nan", "none", "null", "0")
-                ),
-                None,
-            ),
-            axis=1,
-        )
+        df["__merged_phone__"] = shared.merge_phone_columns(df, phone_cols)
         phone_col = "__merged_phone__"
 
     email_col = email_cols[0] if email_cols else None
 
-    df["__is_duplicate__"] = False
-
-    if not phone_col and not email_col:
-        return df
-
-    def clean_phone_local(x):
-        if pd.isna(x): return None
-        x = str(x).strip()
-        if x.endswith(".0"): x = x[:-2]
-        x = re.sub(r"[^\d]", "", x)
-        if x.startswith("91") and len(x) > 10: x = x[2:]
-        if 7 <= len(x) <= 12: return x
-        return None
-
-    def clean_email_local(x):
-        if pd.isna(x): return None
-        x = str(x).strip().lower()
-        if re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", x): return x
-        return None
+    is_dup = pd.Series(False, index=df.index)
 
+    # duplicated(keep=False) flags every member of a repeated value in one
+    # hashed pass; missing values never count as a match. The cleaned values
+    # stay local — only the flag is attached to the frame.
     if phone_col:
-        df["_clean_phone_"] = df[phone_col].apply(clean_phone_local)
-    if email_col:
-        df["_clean_email_"] = df[email_col].apply(clean_email_local)
-
-    if phone_col:
-        phone_counts = df["_clean_phone_"].value_counts()
-        dup_phones = phone_counts[phone_counts > 1].index
-        df.loc[df["_clean_phone_"].isin(dup_phones), "__is_duplicate__"] = True
+        clean_phone = clean_phone_series(df[phone_col])
+        is_dup |= clean_phone.duplicated(keep=False) & clean_phone.notna()
 
     if email_col:
-        email_counts = df["_clean_email_"].value_counts()
-        dup_emails = email_counts[email_counts > 1].index
-        df.loc[df["_clean_email_"].isin(dup_emails), "__is_duplicate__"] = True
-
-    df.drop(
-        columns=[c for c in ["_clean_phone_", "_clean_email_"] if c in df.columns],
-        inplace=True,
-    )
+        clean_email = clean_email_series(df[email_col])
+        is_dup |= clean_email.duplicated(keep=False) & clean_email.notna()
 
-    return df
\ No newline at end of file
+    df["__is_duplicate__"] = is_dup
+    return df
@@ -11,6 +11,7 @@ Public API:
 """
 
 from fastapi import Request, HTTPException, Depends
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from auth import get_current_user
@@ -96,18 +97,19 @@ def get_sidebar_context(request: Request, db: Session, current_user: User) -> di
     role = (current_user.role or "").strip().lower()
 
     if role == "admin":
-        users = (
-            db.query(User)
-            .filter(User.role != "admin", User.is_active == True)
-            .order_by(User.username)
-            .all()
-        )
-
-        # (User, dataset_count) tuples — sidebar badge needs the count
-        admin_users = []
-        for u in users:
-            count = db.query(Dataset).filter(Dataset.user_id == u.id).count()
-            admin_users.append((u, count))
+        # (User, dataset_count) tuples — sidebar badge needs the count.
+        # One outer-joined GROUP BY instead of a COUNT query per user.
+        admin_users = [
+            (u, count)
+            for u, count in (
+                db.query(User, func.count(Dataset.id))
+                .outerjoin(Dataset, Dataset.user_id == User.id)
+                .filter(User.role != "admin", User.is_active == True)
+                .group_by(User.id)
+                .order_by(User.username)
+                .all()
+            )
+        ]
 
         sidebar_data["admin_users"] = admin_users
         sidebar_data["selected_user_id"] = request.session.get("selected_user_id")
@@ -0,0 +1,66 @@
+"""
+utils/user_stats.py
+-------------------
+Materialised per-user profile totals (models.UserStats).
+
+Writes are rare (upload / delete / category change) and reads happen on
+every profile render, so the aggregate is recomputed once per write and
+stored. Recomputing — rather than incrementing — keeps the row correct
+however the datasets changed.
+
+Public API:
+  refresh_user_stats(db, user_id)  → recompute + store, commits
+  get_user_stats(db, user_id)      → UserStats row (built on first use)
+"""
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Category, Dataset, UserStats
+
+
+def _compute(db: Session, user_id: int) -> tuple:
+    """(datasets, rows, duplicates, categories) for one user in one query."""
+    total_categories_sq = (
+        db.query(func.count(Category.id))
+        .filter(Category.user_id == user_id)
+        .scalar_subquery()
+    )
+    datasets, rows, duplicates, categories = (
+        db.query(
+            func.count(Dataset.id),
+            func.coalesce(func.sum(Dataset.row_count), 0),
+            func.coalesce(func.sum(Dataset.duplicate_records), 0),
+            total_categories_sq,
+        )
+        .filter(Dataset.user_id == user_id)
+        .one()
+    )
+    return datasets, rows, duplicates, categories or 0
+
+
+def refresh_user_stats(db: Session, user_id: int) -> UserStats:
+    """Recompute the user's totals and upsert their UserStats row."""
+    for attempt in range(2):
+        stats = db.get(UserStats, user_id) or UserStats(user_id=user_id)
+        (
+            stats.total_datasets,
+            stats.total_rows,
+            stats.total_duplicates,
+            stats.total_categories,
+        ) = _compute(db, user_id)
+        db.add(stats)
+        try:
+            db.commit()
+            return stats
+        except IntegrityError:
+            # A concurrent request inserted the row first — update it instead
+            db.rollback()
+            if attempt:
+                raise
+
+
+def get_user_stats(db: Session, user_id: int) -> UserStats:
+    """Stored totals; users from before the table existed get built here."""
+    return db.get(UserStats, user_id) or refresh_user_stats(db, user_id)